@@ -1,7 +1,19 @@
+import time
+STARTED_AT = time.perf_counter() #Taken before anything else is imported, for --startup-profile.
+
 import pygame
 import os
 import datetime
-import pickle
+import threading
+import argparse
+import bisect
+import json
+import cProfile
+import functools
+from collections import OrderedDict, deque
+from model import (MONTHS, MAX_TICKS, MAX_TASKS, grow_rows, TASK_SLOTS, STORAGE, SUBJECTS, SUBJECT_INDEX, Calendar_store, Rule_set, parse_rule, Tick_counter, Tick_history, Planner,
+                   Search_index, Undo_history, Reminder_queue, default_data, Pickle_storage, open_storage, DAYS, SCHEDULE, get_day_type,
+                   CONFIG_FILE, Config_watcher, apply_config, get_config, load_config_or_defaults)
 
 pygame.init()
 
@@ -9,34 +21,60 @@ pygame.init()
 
 WIDTH, HEIGHT = 1000, 500
 FPS = 60
-DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-MONTHS = ['January','February','March','April','May','June','July','August','September','October','November','December']
-WEEKDAYS = ["Monday", "Tuesday", "Thursday", "Friday"]
-INTERVENTIONS = ["Wednesday"]
-WEEKENDS = ["Saturday", "Sunday"]
-MAX_TICKS = 8
-
-
-'''
-Default timetable below, notation:
-(t-24hrtime-Activity--)n 
-n = number of tasks in day
-t = time identifier
---, - =  regular spaces to differentiate tasks
-'''
-TIMETABLE = {
-    "Weekend": "t-0900-Get up, have breakfast.--t-1100-Study time.--t-1500-Start playing.--t-1600-Study again.--t-1800-Code.--t-2000-Study again.--t-2100-Have dinner.--t-2300-Sleep.",
-    "Weekday": "t-0630-Wake up for school.--t-1500-lunch/games.--t-1600-Start to code/HW.--t-1800-Start study.--t-2100-Have dinner.--t-2300-Sleep.",
-    "Intervention": "t-0630-Wake up for school.--t-1630-lunch/games.--t-1730-Start to code/HW.--t-1830-Start study.--t-2100-Have dinner.--t-2300-Sleep."
-} 
-
-FONT = "fonts\\pixel_font-1.ttf" #Custom pixel Font in Fonts directory.
-SUBJECTS = ["Physics", "Maths", "Eng Lit", "Eng Lang", "Geography", "Biology", "Chemistry", "Spanish", "FMaths", "Computing"]
+TEXT_CACHE_SIZE = 512 #Max amount of rendered text surfaces kept in memory at once.
+GRID_CACHE_SIZE = 4 #Max amount of pre-rendered Calendar month grids kept in memory at once.
+SCROLL_ROWS = 3 #Rows of the Tasks screen scrolled by each notch of the mouse wheel.
+SEARCH_RESULTS = 7 #Amount of result rows on the Search screen.
+TERM_DAYS = 91 #Days counted in the Stats screen's "Term" column (about 13 weeks).
+STATS_COLUMNS = (("Subject", 10), ("Week", 260), ("Term", 400), ("Total", 540), ("Streak", 680), ("Best", 840)) #Heading and x position of each column.
+BACKGROUND_COLOR = (50, 50, 50)
+TASK_COLOR = (55, 68, 100) #Text color of the Calendar's task boxes.
+RECURRING_COLOR = (120, 120, 160) #Text color of recurring entries shown in empty task boxes.
+IDLE_MODE = False #If True, the main loop sleeps until input or a timer is due instead of running at FPS (also set with --idle).
+INTERACTION_MS = 1000 #How long after the last input the loop keeps running at full frame rate in idle mode.
+PROFILE_WINDOW = 120 #Amount of frames the profiling overlay averages over.
+PROFILE_KEY = pygame.K_F3 #Shows or hides the profiling overlay.
+PROFILE_FILE = "profile.pstats" #Where --profile writes its cProfile capture.
+KEY_REPEAT_DELAY = 400 #ms a key is held before it starts repeating (eg: holding backspace).
+KEY_REPEAT_INTERVAL = 35 #ms between each repeat of a held key.
+CURSOR_COLOR = (255, 255, 255)
+REMINDER_EVENT = pygame.event.custom_type() #Posted when a reminder is due, with kind, text and date attributes (see model.Reminder_queue).
+REMINDER_SHOWN = 15 #Seconds a reminder is shown for (unless it is clicked away).
+REMINDER_RECT = pygame.Rect(10, 0, WIDTH - 145, 45) #Where reminders are shown, clear of the back buttons.
+REMINDER_COLOR = (200, 170, 60)
+FRAME_BINS = (1, 2, 4, 8, 16, 33) #Upper bounds (ms) of the overlay's frame time histogram bars, the last bar holds anything slower.
+INPUT_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.MOUSEWHEEL, pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT)
+RECORDED_EVENTS = (pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL, pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT) #Events kept by --record (mouse motion is left out, the position is kept per frame).
+
+FONT = get_config().font #Custom pixel Font in Fonts directory (set in CONFIG_FILE, once main has applied it).
+TICK_IMAGE = os.path.join("images", "tick_mark.png")
+PRINTABLE = "".join(chr(i) for i in range(32, 127)) #Characters measured to find the narrowest in a font.
 
 #Functions to convert between 12&24hr time.
 time_convert_12 = lambda time: str(int(time[:-3]) - 12)+":"+time[-2:]+"pm" if int(time[:-3]) > 12 else time+"am" if int(time[:-3]) < 12 else time+"pm" if int(time[:-3]) == 12 else "12 "+time[-3:]+"am" if int(time[:-3]) == 0 else time+"pm"
 time_convert_24 = lambda time: str(int(time[:-5]) + 12 if "pm" in time else int(time[:-5])) + time[-5:-2] if int(time[:-5]) != 12 else "00" + time[-5:-2] if "am" in time else time[:-2]
 
+def timed(name : str):
+    '''
+    Decorator adding a function's run time to the profiler under a name, while profiling is turned on (otherwise the
+    function is just called).
+
+    Parameter:
+    name (str): The name the time is shown under in the profiling overlay.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.add(name, time.perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
 class Button:
     '''
     Holds the information and interactable Rect for an operational button. 
@@ -81,18 +119,77 @@ class Button:
     def get_clicked(self):
         #Check for a left mouse button click.
         if self.clicked_ticks >= FPS:
-            mouse_pos = pygame.mouse.get_pos()
+            mouse_pos = input_source.get_pos()
             if self.rect.collidepoint(mouse_pos):
-                if pygame.mouse.get_pressed()[0]: #Index 0 specifies left mouse button.
+                if input_source.get_pressed()[0]: #Index 0 specifies left mouse button.
                     self.clicked = True #Button is clicked if a collision with mouse and Rect is detected.
         else:
             self.clicked = False #Otherwise, the button is not clicked.
 
+    @timed("buttons")
     def draw(self):
         #Draws out the button and its border.
         draw_highlighted_rect(screen, self.rect, self.bordercolor, self.bordercolor, self.thickness, self.thickness)
         draw_text(screen, FONT, self.text, (self.rect.x + 15, self.rect.y), self.text_size, self.textcolor)
 
+class Hit_grid:
+    '''
+    The layout of a widget made up of equally sized cells in rows (filled left to right, then top to bottom),
+    which turns a position into the index of the cell under it with arithmetic instead of checking every rect.
+
+    Attributes:
+    x (int): x coordinate of the topleft of the first cell.
+    y (int): y coordinate of the topleft of the first cell.
+    cell_width (int): Width of each cell.
+    cell_height (int): Height of each cell.
+    columns (int): Amount of cells in each row.
+    count (int): Amount of cells in total.
+    '''
+    def __init__(self, x : int, y : int, cell_width : int, cell_height : int, columns : int, count : int):
+        self.x = x
+        self.y = y
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.columns = columns
+        self.count = count
+
+    def rect(self, index : int) -> pygame.rect.Rect:
+        #Returns the rect of a cell.
+        return pygame.Rect(self.x + (index % self.columns)*self.cell_width, self.y + (index // self.columns)*self.cell_height, self.cell_width, self.cell_height)
+
+    def rects(self) -> list:
+        #Returns the rects of every cell, in order.
+        return [self.rect(index) for index in range(self.count)]
+
+    def hit(self, pos : tuple) -> int:
+        #Returns the index of the cell at pos (with the same edges as pygame.Rect.collidepoint), or None if there isnt one.
+        if pos[0] < self.x or pos[1] < self.y:
+            return None
+        column = (pos[0] - self.x) // self.cell_width
+        index = ((pos[1] - self.y) // self.cell_height)*self.columns + column
+        if column >= self.columns or index >= self.count:
+            return None
+        return index
+
+class Hit_index:
+    '''
+    Hit-test index of a screen layout, built once with the layout. Holds a Hit_grid for each clickable widget
+    and turns a mouse position into (widget, index) in constant time.
+
+    Attributes:
+    grids (dict): Each widget's name as key and its Hit_grid as value.
+    '''
+    def __init__(self, grids : dict):
+        self.grids = grids
+
+    def hit(self, pos : tuple) -> tuple:
+        #Returns the (widget, index) at pos, or (None, None) if nothing clickable is there.
+        for widget, grid in self.grids.items():
+            index = grid.hit(pos)
+            if index is not None:
+                return widget, index
+        return None, None
+
 class Menu:
     '''
     Class that stores the state of variables in the Menu screen specifically. This includes the tick sheet per subject
@@ -105,38 +202,69 @@ class Menu:
     now_text (str): The current task in the timetable.
     next_text (str): The next task in the timetable.
     time (str): The time of the next task.
+    next_transition (datetime.datetime): When the current task next changes, so the menu is refreshed then.
 
     '''
     def __init__(self):
         self.now_rect = pygame.Rect(0, HEIGHT - 70, 500, 70)
         self.next_rect = pygame.Rect(0, 365, 500, 70)
-        time = str(datetime.datetime.now())[11:16] # Specifies time in 24hr format (current time).
-        day = DAYS[datetime.datetime.now().weekday()] # The current day (eg: Monday, Tuesday, etc)
-        self.date_today = str(datetime.datetime.now())[:10] 
+        self.refresh()
 
-        day_type = "Intervention" if day in INTERVENTIONS else "Weekend" if day in WEEKENDS else "Weekday"
-        self.now_text = self.update_now(TIMETABLE[day_type], time)[0]
-        self.next_text = self.update_now(TIMETABLE[day_type], time)[1]
-        self.time = self.update_now(TIMETABLE[day_type], time)[2]
-
-    def update_now(self, timetable : str, time : str) -> tuple:
+    def update_now(self, timetable : tuple, minutes : int) -> tuple:
         '''
         Function that calculates the current, next and time for next tasks based on the current time and given timetable.
 
         Parameters:
-        timetable (str): The timetable using specified notation previously set.
-        time (str): The 24hr current time.
+        timetable (tuple): A compiled timetable (from SCHEDULE).
+        minutes (int): The current time in minutes since midnight.
 
         Returns:
-        tuple : Current task, Next task, Time of next task
+        tuple : Current task, Next task, Time of next task, Index of next task (None if there isnt one)
         '''
-        tasks = timetable.split("--")
-        int_time = int(time[:2] + time[3:])
-        for task in range(len(tasks)):
-            if int(tasks[task][2:6]) > int_time:
-                return tasks[task-1][7:], tasks[task][7:], int(tasks[task][2:6]) #Current task of timetable.
-        return "sleeping", "sleeping", "1100PM+" #If current time doesnt fall in range of timetable, I have to be sleeping.
+        times, labels, activities = timetable
+        index = bisect.bisect_right(times, minutes) #Index of the first task starting after now.
+        if index == len(times):
+            return "sleeping", "sleeping", "1100PM+", None #If current time doesnt fall in range of timetable, I have to be sleeping.
+        return activities[index - 1], activities[index], labels[index], index #Current task of timetable.
 
+    def refresh(self, now=None):
+        '''
+        Updates the date, current and next tasks and works out when they will next change.
+
+        Parameter:
+        now (datetime.datetime): The time to refresh for, defaults to the current time.
+        '''
+        now = now or input_source.now()
+        self.date_today = str(now)[:10]
+        timetable = SCHEDULE[get_day_type(now.date())]
+        self.now_text, self.next_text, self.time, index = self.update_now(timetable, now.hour*60 + now.minute)
+
+        midnight = datetime.datetime.combine(now.date(), datetime.time())
+        if index is None:
+            self.next_transition = midnight + datetime.timedelta(days=1) #The next day may follow a different timetable.
+        else:
+            self.next_transition = midnight + datetime.timedelta(minutes=timetable[0][index])
+
+    def check_transition(self, now=None):
+        #Refreshes the menu (and marks it as dirty) once the time of the next task has been reached.
+        now = now or input_source.now()
+        if now >= self.next_transition:
+            date_today = self.date_today
+            self.refresh(now)
+            if self.date_today != date_today:
+                renderer.mark_all() #The date (and highlighted day in the Calendar) changed too.
+            else:
+                self.invalidate()
+
+    def ms_until_transition(self) -> int:
+        #Returns the ms left until the next task starts, used as a timer for idle waiting.
+        return int((self.next_transition - input_source.now()).total_seconds()*1000) + 1
+
+    def invalidate(self):
+        #Marks the now/next part of the Menu screen as dirty (the text may run past the rects, so the full width is used).
+        renderer.mark_dirty(pygame.Rect(0, self.next_rect.y, WIDTH, HEIGHT - self.next_rect.y))
+
+    @timed("menu")
     def draw(self):
         #Draws out the Menu screen.
         pygame.draw.line(screen, (0, 0, 0), ((WIDTH//2) - 5, 0), ((WIDTH//2) - 5, HEIGHT), 10)
@@ -147,138 +275,313 @@ class Menu:
         draw_text(screen, FONT, self.date_today, (20, 20), 40, (100, 100, 100))
         draw_text(screen, FONT, f"NEXT@{str(self.time)[:2]}:{str(self.time)[2:]} - {self.next_text}", (15, 370), 40, (0, 0 ,0))
 
+def month_length(year : int, month : int) -> int:
+    #Returns the amount of days in a month of a given year.
+    next_month = datetime.date(year + month//12, month%12 + 1, 1)
+    return (next_month - datetime.date(year, month, 1)).days
+
+WEEKDAY_NAMES = {} #Memoised weekday_names, keyed by (year, month).
+
+def weekday_names(year : int, month : int) -> list:
+    #Returns the day name (eg: Monday) of every day in a month, worked out from the first day's weekday.
+    key = (year, month)
+    if key not in WEEKDAY_NAMES:
+        first = datetime.date(year, month, 1).weekday()
+        WEEKDAY_NAMES[key] = [DAYS[(first + day) % 7] for day in range(month_length(year, month))]
+    return WEEKDAY_NAMES[key]
+
 class Calendar:
     '''
     Class that stores the state of variables in the Calendar screen specifically. This includes the day screen, as well as 
-    all the days and months in 2024 with editable task boxes for each day.
+    all the days and months of any year with editable task boxes for each day.
 
     Attributes:
     day (int): The current day's number relative to the month it is in.
+    current_year (int): The year of the month being shown.
     current_month (int): The current month's number out of 12. (eg: June -> 6)
-    month_lengths (dict): A dictionary comprising of all the months and their lengths in terms of days in 2024.
-    month_data (dict): Stores the initialised empty string values for each day's task box in 2024.
+    store (Calendar_store): Holds the text of every task box that has been written in.
+    rules (Rule_set): The recurring entries, shown in the empty task boxes of the days they fall on.
+    loaded_months (set): The (year, month)s already fetched from storage.
     day_window (bool): True, if any day's task list is opened (also known as the day window).
-    selected_day (int): Initialised to None, but once day is clicked, that day number is set as 'selected_day' based on index in the month_data dict.
-    selected_task (int): Initialised to None, but once a task is selected in that day, it corresponds to that paticular index in the month_data dict.
-    day_rects (dict): A list of rects which comprise the day boxes in the Calendar screen as values and the month as key.
-    task_rects (dict): A dict of rects which comprise the task boxes in the day window.
+    selected_day (int): Initialised to None, but once day is clicked, that day number is set as 'selected_day' based on index in the month (from 0).
+    selected_task (int): Initialised to None, but once a task is selected in that day, it corresponds to that paticular index in the day.
+    day_rects (dict): Lists of rects which comprise the day boxes in the Calendar screen as values, and the amount of days in the month as key.
+    day_index (dict): The Hit_index of the day boxes as values, and the amount of days in the month as key.
+    task_rects (list): A list of rects which comprise the task boxes in the day window (the same for every day).
+    task_index (Hit_index): Hit-test index of the task boxes in the day window.
+    grid_surfaces (OrderedDict): The pre-rendered month grids (everything but the highlight of today), keyed by (year, month), oldest first.
 
     '''
     def __init__(self): 
         #Initialises all variables pertaining to day_window and Calendar scereen.
 
-        self.day = datetime.datetime.today().day
-        self.current_month = datetime.datetime.today().month
-        self.current_day_name = datetime.date.today().strftime("%A")
-        
-        self.month_lengths = {
-            "January": 31,
-            "February": 29,
-            "March": 31,
-            "April": 30,
-            "May": 31,
-            "June": 30,
-            "July": 31,
-            "August": 31,
-            "September": 30,
-            "October": 31,
-            "November": 30,
-            "December": 31
-        }
-        self.month_data = {}
-        for month, days in self.month_lengths.items():
-            self.month_data[month] = [["", "", "", "", "", ""] for _ in range(days)]
-            '''
-            This dict is multidimensional, the order of items goes in the order below, 
-            where n() shows a repeat in that structure:
-
-            self.month_data = { n(Month_name : [n(["", "", "", "", "", ""])]) }
-
-            To summarise, each month in 2024, has a list (all the days, where each sub list is a day) 
-            of lists (which hold the data for each task box as a string), to allow data from the 
-            .pickle file to be loaded onto the month_data dict.
-            ''' 
+        today = input_source.now()
+        self.day = today.day
+        self.current_year = today.year
+        self.current_month = today.month
+        self.current_day_name = today.strftime("%A")
+
+        self.store = Calendar_store()
+        self.rules = Rule_set()
+        self.loaded_months = set()
         self.day_window = False
         self.selected_day = None
         self.selected_task = None
 
         self.day_rects = {}
-        self.task_rects = {}
-
-        positions = []
-        width = 100
-        height = 100
-
-        #Loop organises the positions of all rects present on the Calendar screen for each month and each day in that month, beforehand.
-        for month in self.month_data:
-            self.day_rects[month] = []
-            self.task_rects[month] = []
-            current_pos = [-width, 100]
-            for day in self.month_data[month]:
-                taskbox_pos = [0, 70]
-                if current_pos[0] + width*2 > WIDTH:
-                    current_pos[0] = 0
-                    current_pos[1] += height
-                else:
-                    current_pos[0] += width
-
-                #Seperate loop to organise the task boxes in each day of each month.
-                for _ in day:
-                    self.task_rects[month].append(pygame.Rect(*taskbox_pos, WIDTH, 70))
-                    taskbox_pos[1] += 70
-                positions.append(tuple(current_pos))
-                self.task_rects
-                self.day_rects[month].append(pygame.Rect(*current_pos, width, height))
+        self.day_index = {}
+        self.task_index = Hit_index({"tasks": Hit_grid(0, 70, WIDTH, 70, 1, TASK_SLOTS)})
+        self.task_rects = self.task_index.grids["tasks"].rects()
+        self.grid_surfaces = OrderedDict()
+
+    def get_day_rects(self) -> list:
+        #Returns the day box rects of the month being shown, organising their positions the first time a month of that length is shown.
+        days = month_length(self.current_year, self.current_month)
+        if days not in self.day_rects:
+            width = 100
+            height = 100
+            grid = Hit_grid(0, 100, width, height, WIDTH//width, days) #As many days as fit in each row of the screen.
+            self.day_index[days] = Hit_index({"days": grid})
+            self.day_rects[days] = grid.rects()
+        return self.day_rects[days]
+
+    def get_day_index(self) -> Hit_index:
+        #Returns the hit-test index of the day boxes of the month being shown.
+        self.get_day_rects()
+        return self.day_index[month_length(self.current_year, self.current_month)]
+
+    def change_month(self, step : int):
+        #Moves the month being shown forwards or backwards by step, carrying over into other years.
+        months = self.current_year*12 + self.current_month - 1 + step
+        self.current_year, self.current_month = months//12, months%12 + 1
+
+    def open_day(self, date : datetime.date, task_index : int):
+        #Opens the day window of any date, with one of its task boxes selected.
+        self.current_year, self.current_month = date.year, date.month
+        self.selected_day = date.day - 1
+        self.selected_task = task_index
+        self.day_window = True
+
+    def selected_date(self) -> datetime.date:
+        #Returns the date of the selected day.
+        return datetime.date(self.current_year, self.current_month, self.selected_day + 1)
 
     def day_name(self, month : int, day : int) -> str:
-        #Returns the paticular day name based on a given day and month (in 2024).
-        target_date = datetime.datetime(2024, month, day)
-        day_name = target_date.strftime("%A")
-        return day_name
+        #Returns the paticular day name based on a given day and month (in the year being shown).
+        return weekday_names(self.current_year, month)[day - 1]
+
+    def get_grid_surface(self) -> pygame.surface.Surface:
+        #Returns the month grid (title, day boxes, numbers and day initials) of the month being shown, rendering it only the first time.
+        key = (self.current_year, self.current_month)
+        grid = self.grid_surfaces.get(key)
+        if grid is not None:
+            self.grid_surfaces.move_to_end(key)
+            return grid
+
+        grid = pygame.Surface((WIDTH, HEIGHT))
+        if pygame.display.get_surface() is not None:
+            grid = grid.convert() #Matches the screen's pixel format, so blitting it is quick.
+        grid.fill(BACKGROUND_COLOR)
+        draw_text(grid, FONT, f"{MONTHS[self.current_month - 1]} {self.current_year}", (10, 0), 65, (100, 100, 100))
+        names = weekday_names(self.current_year, self.current_month)
+        for num, rect in enumerate(self.get_day_rects(), 1):
+            draw_highlighted_rect(grid, rect, (0, 0, 0), (0, 0, 0), 1, 1)
+            draw_text(grid, FONT, f"{str(num)} {names[num - 1][0]}", (rect.x + 4, rect.y - 5), 45, (255, 0, 0))
+
+        self.grid_surfaces[key] = grid
+        if len(self.grid_surfaces) > GRID_CACHE_SIZE:
+            self.grid_surfaces.popitem(last=False)
+        return grid
+
+    def get_day(self, date : datetime.date):
+        #Returns the task box strings of a day, fetching its month from storage the first time the month is needed.
+        if (date.year, date.month) not in self.loaded_months:
+            self.store.days.update(storage.load_month(date.year, date.month))
+            self.loaded_months.add((date.year, date.month))
+        return self.store.get_day(date)
+
+    def get_entries(self, date : datetime.date) -> list:
+        '''
+        Returns what is shown in each task box of a day: the text written in it, or else the next of the day's recurring entries.
 
+        Parameter:
+        date (datetime.date): The day.
+
+        Returns:
+        list : (text, rule index) for each task box, with a rule index of None for written text.
+        '''
+        occurrences = iter(self.rules.on_day(date))
+        entries = []
+        for text in self.get_day(date):
+            if not text:
+                index, text = next(occurrences, (None, ""))
+                entries.append((text, index))
+            else:
+                entries.append((text, None))
+        return entries
+
+    def commit_rule(self, task_index : int) -> bool:
+        '''
+        Turns the text of a task box in the selected day into a recurring entry, if it is written as one (see model.parse_rule).
+
+        Parameter:
+        task_index (int): Index of the task box in the day.
+
+        Returns:
+        bool : True, if a recurring entry was added.
+        '''
+        date = self.selected_date()
+        rule = parse_rule(self.get_day(date)[task_index], date, input_source.now().date())
+        if rule is None:
+            return False
+        old_rules = self.rules.to_list()
+        undo_history.seal() #Undone separately from the typing before it.
+        self.set_task(task_index, "")
+        self.rules.add(rule)
+        record_edit(("rules", self.rules.to_list()), ("rules", old_rules), join=True)
+        renderer.mark_all() #The entry may show on any day.
+        return True
+
+    def remove_rule(self, task_index : int):
+        #Removes the recurring entry shown in a task box of the selected day, if there is one.
+        index = self.get_entries(self.selected_date())[task_index][1]
+        if index is not None:
+            old_rules = self.rules.to_list()
+            self.rules.remove(index)
+            record_edit(("rules", self.rules.to_list()), ("rules", old_rules))
+            renderer.mark_all()
+
+    def set_rules(self, rules : list):
+        #Swaps every recurring entry for others (as tuples, see model.Rule.to_tuple), recording the edit in storage.
+        self.rules.replace(rules)
+        record_edit(("rules", self.rules.to_list()))
+        renderer.mark_all()
+
+    def set_task(self, task_index : int, text : str):
+        '''
+        Changes the text of a task box in the selected day, recording the edit in storage.
+
+        Parameters:
+        task_index (int): Index of the task box in the day.
+        text (str): The new text of the task box.
+        '''
+        self.set_cell(self.selected_date(), task_index, text)
+
+    def set_cell(self, date : datetime.date, task_index : int, text : str):
+        '''
+        Changes the text of a task box in any day, recording the edit in storage.
+
+        Parameters:
+        date (datetime.date): The day.
+        task_index (int): Index of the task box in the day.
+        text (str): The new text of the task box.
+        '''
+        old_text = self.get_day(date)[task_index]
+        if text == old_text:
+            return
+        old_entry = self.get_entries(date)[task_index][0]
+        self.store.set(date.isoformat(), task_index, text)
+        if self.day_window and self.selected_day is not None and date == self.selected_date():
+            self.invalidate_task(task_index, old_entry)
+        else:
+            renderer.mark_all() #Eg: undone from another screen (like Today), which may be showing the day.
+        record_edit(("cell", date.isoformat(), task_index, text), ("cell", date.isoformat(), task_index, old_text))
+
+    def invalidate_task(self, task_index : int, old_text : str):
+        '''
+        Marks a task box in the day window (or today screen) as dirty after its text changed.
+
+        Parameters:
+        task_index (int): Index of the task box in the day.
+        old_text (str): The text of the task box before it was changed.
+        '''
+        pos = (0, 70 + 70*task_index)
+        new_text = self.get_entries(self.selected_date())[task_index][0]
+        renderer.mark_text(FONT, pos, HEIGHT//6, old_text, new_text)
+
+    @timed("calendar")
     def draw(self):
         #Draws all the rects and lines for the Calendar screen or day window depending on self.day_window.
         if not self.day_window:
-            #If Calendar screen
-            draw_text(screen, FONT, str(MONTHS[self.current_month - 1]), (10, 0), 65, (100, 100, 100))
-            num = 1
-            day_index = 1
-            for rect in self.day_rects[MONTHS[self.current_month - 1]]:
-                color = (255, 0, 0) if datetime.datetime.today().day == num and datetime.datetime.now().strftime("%B") == MONTHS[self.current_month - 1] else (0, 0, 0)
-                draw_highlighted_rect(screen, rect, color, color, 1, 1)
-                draw_text(screen, FONT, f"{str(num)} {self.day_name(self.current_month, day_index)[0]}", (rect.x + 4, rect.y - 5), 45, (255, 0, 0))
-                num += 1
-                day_index += 1
+            #If Calendar screen, the cached grid is blit and only today's box is highlighted on top.
+            screen.blit(self.get_grid_surface(), (0, 0))
+            date = input_source.now().date()
+            if (date.year, date.month) == (self.current_year, self.current_month):
+                draw_highlighted_rect(screen, self.get_day_rects()[date.day - 1], (255, 0, 0), (255, 0, 0), 1, 1)
 
         else:
             #Otherwise day_window
             draw_text(screen, FONT, f"{str(MONTHS[self.current_month - 1])} {str(self.selected_day + 1)}", (10, 0), 65, (100, 100, 100))
             current_pos = [0, 70]
-            for task in self.month_data[MONTHS[self.current_month - 1]][self.selected_day]:
+            for task, rule_index in self.get_entries(self.selected_date()):
                 pygame.draw.line(screen, (0, 0, 0), current_pos, (WIDTH, current_pos[1]), 5)
-                draw_text(screen, FONT, task, current_pos, HEIGHT//6, (55, 68, 100))
+                draw_text(screen, FONT, task, current_pos, HEIGHT//6, TASK_COLOR if rule_index is None else RECURRING_COLOR)
                 current_pos[1] += 70
+
 class Tasks:
     '''
     Class that stores the state of variables in the Task screen specifically. This only includes tasks and notes on them (extra info).
+    The lists hold any amount of rows (with an empty one always at the end to write in), of which only the window of rows
+    that fits on the screen is laid out and drawn, so drawing costs the same however many rows there are.
 
     Attributes:
-    task_boxes (list): List of Rects that comprise the task boxes.
-    notes_boxes (list): List of Rects that comprise the notes boxes.
-    tasks (list): List of strings with corresponding indexes to its Rect list that stores the actual tasks as strings.
-    notes (list): List of strings with corresponding indexes to its Rect list that stores the actual notes as strings.
+    rows (int): Amount of rows shown on the screen at once.
+    task_boxes (list): List of Rects that comprise the task boxes shown.
+    notes_boxes (list): List of Rects that comprise the notes boxes shown.
+    hit_index (Hit_index): Hit-test index of the task ("tasks") and note ("notes") boxes shown.
+    tasks (list): List of strings, the first shown in the box scroll rows down the list, that stores the actual tasks as strings.
+    notes (list): List of strings, the first shown in the box scroll rows down the list, that stores the actual notes as strings.
+    scroll (int): Index of the row shown at the top of the screen.
+    row_surfaces (OrderedDict): The pre-rendered boxes (outline and text) keyed by (notes_or_tasks, index), oldest first.
     '''
     def __init__(self, max_tasks : int):
         '''
         Initialises the positions of rects and empty strings of all the task and note boxes.
 
         Parameters:
-        max_tasks (int): The max number of tasks projected on the screen (along with its corresponding note box).
+        max_tasks (int): The max number of tasks projected on the screen (along with its corresponding note box), counting the title row.
         '''
-        self.task_boxes = [pygame.Rect(0, i*HEIGHT//max_tasks + HEIGHT//max_tasks, WIDTH//3, HEIGHT//max_tasks) for i in range(max_tasks - 1)]
-        self.notes_boxes = [pygame.Rect(WIDTH//3, j*HEIGHT//max_tasks + HEIGHT//max_tasks, WIDTH - WIDTH//3, HEIGHT//max_tasks) for j in range(max_tasks - 1)]
-        self.tasks = ["" for _ in range(max_tasks)]
-        self.notes = ["" for _ in range(max_tasks)]
+        height = HEIGHT//max_tasks
+        self.rows = max_tasks - 1 #The first row is taken by the titles.
+        self.hit_index = Hit_index({
+            "tasks": Hit_grid(0, height, WIDTH//3, height, 1, self.rows),
+            "notes": Hit_grid(WIDTH//3, height, WIDTH - WIDTH//3, height, 1, self.rows)
+        })
+        self.task_boxes = self.hit_index.grids["tasks"].rects()
+        self.notes_boxes = self.hit_index.grids["notes"].rects()
+        self.scroll = 0
+        self.row_surfaces = OrderedDict()
+        self.set_lists(["" for _ in range(max_tasks)], ["" for _ in range(max_tasks)])
+
+    def set_lists(self, tasks : list, notes : list):
+        #Shows other task and note lists (eg: once saved data is loaded), adding an empty row to the end to write in if there isnt one.
+        self.tasks = tasks
+        self.notes = notes
+        last = max((i for i in range(len(tasks) - 1, -1, -1) if tasks[i] or notes[i]), default=-1)
+        grow_rows(tasks, notes, last + 2)
+        self.row_surfaces.clear()
+        renderer.mark_dirty(self.scroll_bar_rect())
+        self.scroll_to(self.scroll)
+
+    def scroll_to(self, scroll : int):
+        #Moves the window of rows shown, so scroll is the top row (kept within the list).
+        scroll = max(0, min(len(self.tasks) - self.rows, scroll))
+        if scroll != self.scroll:
+            self.scroll = scroll
+            renderer.mark_all()
+
+    def show_row(self, index : int):
+        #Scrolls just enough for a row to be shown.
+        if index < self.scroll:
+            self.scroll_to(index)
+        elif index >= self.scroll + self.rows:
+            self.scroll_to(index - self.rows + 1)
+
+    def box(self, notes_or_tasks : str, index : int) -> pygame.rect.Rect:
+        #Returns the rect of the task or note box a row is shown in, None if the row is scrolled off the screen.
+        if not self.scroll <= index < self.scroll + self.rows:
+            return None
+        return (self.notes_boxes if notes_or_tasks == "notes" else self.task_boxes)[index - self.scroll]
 
     def check_mouseclick(self) -> tuple:
         '''
@@ -287,94 +590,394 @@ class Tasks:
         Returns:
         clicked (bool): Whether or not the mosue clicked something.
         notes_or_tasks (str): Whether notes or task boxes were clicked.
-        index (int): Index in either task or note boxes list depending specifically on which one was chosen.
+        index (int): Index in either task or note list depending specifically on which one was chosen.
         '''
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = input_source.get_pos()
         notes_or_tasks = ""
-        index = None #Will hold value of index of either one of task or note boxes list.
+        index = None #Will hold value of index of either one of task or note lists.
         clicked = False
-        for rect in self.task_boxes: #Loops through task boxes to check for collisions with mouse.
-            if rect.collidepoint(mouse_pos):
-                if pygame.mouse.get_pressed()[0]: #Checks for left click.
-                    clicked = True
-                    index = self.task_boxes.index(rect) #Accordingly logs the correct index in task_boxes list (marked as selected).
+        widget, box_index = self.hit_index.hit(mouse_pos) #Finds the box under the mouse, if any.
+        if widget is not None and self.scroll + box_index < len(self.tasks):
+            if input_source.get_pressed()[0]: #Checks for left click.
+                clicked = True
+                index = self.scroll + box_index #Logs the index in the tasks or notes list (marked as selected).
 
-                elif pygame.mouse.get_pressed()[2]: #Checks for right click.
-                    clicked = True
-                    index = self.task_boxes.index(rect)
+            elif input_source.get_pressed()[2]: #Checks for right click.
+                clicked = True
+                index = self.scroll + box_index
 
-                    self.tasks[index] = "" #Clears that paticular boxes text (a delete function to delete all at once).
+                undo_history.seal() #Undone on its own, rather than with any typing before it.
+                self.set_text(widget, index, "") #Clears that paticular boxes text (a delete function to delete all at once).
 
-                notes_or_tasks = "tasks" 
+            notes_or_tasks = widget
+        return (clicked, notes_or_tasks, index)
 
-        for rect in self.notes_boxes: #Loops through notes boxes to check for collisions with mouse.
-            if rect.collidepoint(mouse_pos):
-                if pygame.mouse.get_pressed()[0]: #Checks for left click.
-                    clicked = True
-                    index = self.notes_boxes.index(rect) #Accordingly logs the correct index in notes_boxes list (marked as selected).
+    def set_text(self, notes_or_tasks : str, index : int, text : str):
+        '''
+        Changes the text of a task or note box, recording the edit in storage. Writing in the last row adds an empty one after it.
 
-                elif pygame.mouse.get_pressed()[2]: #Checks for right click.
-                    clicked = True
-                    index = self.notes_boxes.index(rect)
+        Parameters:
+        notes_or_tasks (str): Whether it is a "notes" or "tasks" box.
+        index (int): Index of the box in its list.
+        text (str): The new text of the box.
+        '''
+        texts = self.notes if notes_or_tasks == "notes" else self.tasks
+        old_text = texts[index]
+        if text == old_text:
+            return
+        texts[index] = text
+        if text and index == len(texts) - 1:
+            grow_rows(self.tasks, self.notes, index + 2)
+            renderer.mark_dirty(self.scroll_bar_rect()) #The bar's size and position depend on the amount of rows.
+        self.invalidate(notes_or_tasks, index, old_text)
+        record_edit(("text", notes_or_tasks, index, text), ("text", notes_or_tasks, index, old_text))
+
+    def invalidate(self, notes_or_tasks : str, index : int, old_text : str):
+        '''
+        Marks a task or note box as dirty after its text changed.
 
-                    self.notes[index] = "" #Clears that paticular boxes text (a delete function to delete all at once).
+        Parameters:
+        notes_or_tasks (str): Whether it is a "notes" or "tasks" box.
+        index (int): Index of the box in its list.
+        old_text (str): The text of the box before it was changed.
+        '''
+        self.row_surfaces.pop((notes_or_tasks, index), None)
+        box = self.box(notes_or_tasks, index)
+        if box is not None: #Rows scrolled off the screen arent drawn.
+            renderer.mark_dirty(box)
+
+    def get_row_surface(self, notes_or_tasks : str, index : int, box : pygame.rect.Rect) -> pygame.surface.Surface:
+        #Returns a task or note box (its outline and text) pre-rendered, rendering it only when it is first shown or its text changed.
+        key = (notes_or_tasks, index)
+        surface = self.row_surfaces.get(key)
+        if surface is not None:
+            self.row_surfaces.move_to_end(key)
+            return surface
+
+        surface = pygame.Surface(box.size)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert() #Matches the screen's pixel format, so blitting it is quick.
+        surface.fill(BACKGROUND_COLOR)
+        draw_highlighted_rect(surface, surface.get_rect(), (0, 0, 0), (0, 0, 0), 1, 1)
+        if notes_or_tasks == "notes":
+            draw_text(surface, FONT, self.notes[index], (5, 0), box.height, (50, 250, 50))
+        else:
+            draw_text(surface, FONT, self.tasks[index], (5, 0), box.height, (200, 50, 50))
 
-                notes_or_tasks = "notes"
-        return (clicked, notes_or_tasks, index)
+        self.row_surfaces[key] = surface
+        if len(self.row_surfaces) > 4*self.rows: #Enough for the rows shown and those just scrolled past.
+            self.row_surfaces.popitem(last=False)
+        return surface
 
+    def scroll_bar_rect(self) -> pygame.rect.Rect:
+        #Returns the strip along the right edge the scroll bar is drawn in.
+        top = self.task_boxes[0].y
+        return pygame.Rect(WIDTH - 6, top, 6, HEIGHT - top)
+
+    @timed("tasks")
     def draw(self):
         #Draws all the rects and lines for the Tasks screen.
         draw_text(screen, FONT, "TASKS", (5, -5), 75, (100, 100, 100))
         draw_text(screen, FONT, "NOTES", (WIDTH//3 + 5, -5), 75, (100, 100, 100))
+
+        #Only the rows scrolled to are drawn.
+        for row in range(min(self.rows, len(self.tasks) - self.scroll)):
+            index = self.scroll + row
+            for notes_or_tasks, box in (("tasks", self.task_boxes[row]), ("notes", self.notes_boxes[row])):
+                screen.blit(self.get_row_surface(notes_or_tasks, index, box), box)
         pygame.draw.line(screen, (0, 0, 0), (WIDTH//3, 0), (WIDTH//3, HEIGHT), 3)
 
-        #Loops to procedurally draw task and note boxes.
-        for task in self.task_boxes:
-            draw_highlighted_rect(screen, task, (0, 0, 0), (0, 0, 0), 1, 1)
-            draw_text(screen, FONT, self.tasks[self.task_boxes.index(task)], (task.x + 5, task.y), task.height, (200, 50, 50))
-        for note in self.notes_boxes:
-            draw_highlighted_rect(screen, note, (0, 0, 0), (0, 0, 0), 1, 1)
-            draw_text(screen, FONT, self.notes[self.notes_boxes.index(note)], (note.x + 5, note.y), note.height, (50, 250, 50))
+        #A scroll bar along the right edge once there are more rows than fit.
+        if len(self.tasks) > self.rows:
+            strip = self.scroll_bar_rect()
+            pygame.draw.rect(screen, (100, 100, 100), (strip.x, strip.y + strip.height*self.scroll//len(self.tasks), 4, max(10, strip.height*self.rows//len(self.tasks))))
+
+class Edit_buffer:
+    '''
+    The text of the box being typed in, held as a list of characters with a cursor, so typing in the middle of
+    (or deleting from) long text doesnt rebuild the string each key. Typed text (TEXTINPUT events, which hold whole
+    pastes or IME input) and editing keys only change the buffer, and the box itself is set by flush once per frame,
+    so a burst of typing, a held key or a paste costs one edit (and one re-render of the box) rather than one per character.
+
+    Attributes:
+    key (tuple): Identifies the box being typed in, None if there isnt one.
+    chars (list): The characters of the text.
+    cursor (int): Index in chars where typed text is inserted.
+    target (function): Called with the new text to set the box, when flushed.
+    pos (tuple): Where the box's text is drawn.
+    fontsize (int): The size the box's text is drawn at.
+    synced (str): The box's text as of the last flush.
+    changed (bool): Whether the text changed since the last flush.
+    moved (bool): Whether the cursor moved since the last flush.
+    cursor_rect (pygame.Rect): Where the cursor was last drawn.
+    '''
+    def __init__(self):
+        self.key = None
+        self.chars = []
+        self.cursor = 0
+        self.target = None
+        self.pos = (0, 0)
+        self.fontsize = 0
+        self.synced = ""
+        self.changed = False
+        self.moved = False
+        self.cursor_rect = pygame.Rect(0, 0, 0, 0)
+
+    def open(self, key : tuple, text : str, target, pos : tuple, fontsize : int):
+        '''
+        Starts typing in a box (finishing with any other box first), with the cursor at the end of its text.
+
+        Parameters:
+        key (tuple): Identifies the box, it isnt reopened if it is already being typed in (unless its text was changed elsewhere, eg: cleared by a right click).
+        text (str): The box's text.
+        target (function): Called with the new text to set the box.
+        pos (tuple): Where the box's text is drawn.
+        fontsize (int): The size the box's text is drawn at.
+        '''
+        if key == self.key and text == self.synced:
+            return
+        if key == self.key:
+            self.changed = False #The box was changed elsewhere, which wins over anything typed but not yet flushed.
+        self.close()
+        self.key = key
+        self.synced = text
+        self.chars = list(text)
+        self.cursor = len(self.chars)
+        self.target = target
+        self.pos = pos
+        self.fontsize = fontsize
+        self.moved = True
+
+    def close(self):
+        #Finishes typing in the box, setting it to any text not yet flushed.
+        self.flush()
+        renderer.mark_dirty(self.cursor_rect)
+        self.key = None
+        self.target = None
+        self.chars = []
+        self.cursor_rect = pygame.Rect(0, 0, 0, 0)
+
+    def text(self) -> str:
+        return "".join(self.chars)
+
+    def insert(self, text : str):
+        #Inserts typed (or pasted) text at the cursor, leaving out line breaks and other control characters (boxes are a single line).
+        text = "".join(char if char.isprintable() else " " for char in text if char not in "\r")
+        self.chars[self.cursor:self.cursor] = text
+        self.cursor += len(text)
+        self.changed = self.changed or bool(text)
+        self.moved = True
+
+    def move(self, cursor : int):
+        #Moves the cursor, kept within the text.
+        cursor = max(0, min(len(self.chars), cursor))
+        if cursor != self.cursor:
+            self.cursor = cursor
+            self.moved = True
+
+    def handle_key(self, event : pygame.event.Event):
+        '''
+        Handles a KEYDOWN for the box (typed characters arrive as TEXTINPUT events instead, see insert).
+
+        Parameter:
+        event (pygame.event.Event): The KEYDOWN event.
+        '''
+        if event.key == pygame.K_BACKSPACE and self.cursor > 0:
+            del self.chars[self.cursor - 1]
+            self.cursor -= 1
+            self.changed = self.moved = True
+        elif event.key == pygame.K_DELETE and self.cursor < len(self.chars):
+            del self.chars[self.cursor]
+            self.changed = True
+        elif event.key == pygame.K_LEFT:
+            self.move(self.cursor - 1)
+        elif event.key == pygame.K_RIGHT:
+            self.move(self.cursor + 1)
+        elif event.key == pygame.K_HOME:
+            self.move(0)
+        elif event.key == pygame.K_END:
+            self.move(len(self.chars))
+        elif event.key == pygame.K_v and event.mod & pygame.KMOD_CTRL:
+            self.insert(clipboard_text())
+
+    def flush(self):
+        #Sets the box to the buffer's text if it changed, and marks where the cursor was and now is as dirty, done once per frame.
+        if self.target is None:
+            return
+        if self.changed:
+            self.synced = self.text()
+            self.target(self.synced)
+            self.changed = False
+        if self.moved:
+            renderer.mark_dirty(self.cursor_rect)
+            width = get_font(FONT, self.fontsize).size(self.text()[:self.cursor])[0]
+            self.cursor_rect = pygame.Rect(min(self.pos[0] + width, WIDTH - 2), self.pos[1] + self.fontsize//8, 2, self.fontsize*3//4)
+            renderer.mark_dirty(self.cursor_rect)
+            self.moved = False
+
+    def draw(self):
+        #Draws the cursor.
+        if self.target is not None:
+            pygame.draw.rect(screen, CURSOR_COLOR, self.cursor_rect)
+
+def clipboard_text() -> str:
+    #Returns the text on the clipboard, or "" if there isnt any (or the clipboard cant be reached, eg: when headless).
+    try:
+        if not pygame.scrap.get_init():
+            pygame.scrap.init()
+        return pygame.scrap.get_text() or ""
+    except (pygame.error, AttributeError):
+        return ""
+
+class Search:
+    '''
+    Holds the information for the Search screen, where the text of every Calendar day, task and note is searched
+    as it is typed (see Search_index). Clicking a result jumps to it.
+
+    Attributes:
+    query (str): The text being searched for.
+    results (list): The keys of the boxes matching the query (see Search_index.texts).
+    hit_index (Hit_index): Hit-test index of the result rows.
+    result_rects (list): The rects of the result rows.
+    '''
+    def __init__(self):
+        self.query = ""
+        self.results = []
+        self.hit_index = Hit_index({"results": Hit_grid(0, 120, WIDTH, 50, 1, SEARCH_RESULTS)})
+        self.result_rects = self.hit_index.grids["results"].rects()
+
+    def set_query(self, query : str):
+        #Changes the text being searched for and finds its results.
+        self.query = query
+        self.results = search_index.search(query, SEARCH_RESULTS)
+        renderer.mark_dirty(pygame.Rect(0, 60, WIDTH, HEIGHT - 60))
+
+    def describe(self, key : tuple) -> str:
+        #Returns the text shown for a result, saying where it is from.
+        text = search_index.texts.get(key, "")
+        if key[0] == "day":
+            date = datetime.date.fromisoformat(key[1])
+            return f"{date.day} {MONTHS[date.month - 1][:3]} {date.year} - {text}"
+        return f"{'Task' if key[0] == 'tasks' else 'Note'} {key[1] + 1} - {text}"
+
+    @timed("search")
+    def draw(self):
+        #Draws the query box and the results under it.
+        draw_text(screen, FONT, "SEARCH", (5, -5), 75, (100, 100, 100))
+        draw_highlighted_rect(screen, pygame.Rect(0, 60, WIDTH, 55), (0, 0, 0), (0, 0, 0), 3, 3)
+        draw_text(screen, FONT, self.query + "_", (10, 60), 50, (255, 255, 255))
+
+        for rect, key in zip(self.result_rects, self.results):
+            draw_highlighted_rect(screen, rect, (0, 0, 0), (0, 0, 0), 1, 1)
+            draw_text(screen, FONT, self.describe(key), (rect.x + 5, rect.y + 5), 40, (55, 68, 100))
+        if self.query.strip() and not self.results:
+            draw_text(screen, FONT, "No matches", (10, 120), 40, (100, 100, 100))
+
+class Stats:
+    '''
+    Holds the information for the Stats screen, which shows the ticks added to each subject this week, this term
+    and over all time, along with the streaks of days in a row with ticks (see Tick_history). The rows are worked
+    out from the history's totals when the screen is opened, rather than every frame.
+
+    Attribute:
+    rows (list): Each row's strings, in the order of STATS_COLUMNS, a row per subject and one for all of them.
+    '''
+    def __init__(self):
+        self.rows = []
+
+    def refresh(self, history : Tick_history):
+        #Works out the rows from a history, as of today.
+        date = input_source.now().date()
+        week = history.week(date)
+        term = history.between(date - datetime.timedelta(days=TERM_DAYS - 1), date)
+        self.rows = [(name, str(week[i]), str(term[i]), str(history.totals[i]), str(history.streak(i, date)), str(history.best_streaks[i]))
+                     for i, name in enumerate(SUBJECTS + ["All"])]
+
+    @timed("stats")
+    def draw(self):
+        #Draws the column headings and a row for each subject.
+        draw_text(screen, FONT, "STATS", (5, -5), 75, (100, 100, 100))
+        for heading, x in STATS_COLUMNS:
+            draw_text(screen, FONT, heading, (x, 65), 35, (100, 100, 100))
+        pygame.draw.line(screen, (0, 0, 0), (0, 100), (WIDTH, 100), 3)
+        for i, row in enumerate(self.rows):
+            color = (255, 255, 255) if i == len(SUBJECTS) else (55, 68, 100) #The total of all subjects stands out.
+            for (_, x), text in zip(STATS_COLUMNS, row):
+                draw_text(screen, FONT, text, (x, 100 + 36*i), 35, color)
 
 class Check_list:
     '''
-    Holds the information for the checklist seen on the Menu screen, this obj interacts with the actual .pickle file
-    to store and save accurately, how many ticks were logged for each subject.
+    Holds the information for the checklist seen on the Menu screen. The amount of ticks logged for each subject (and
+    their history) live in the loaded Planner, which this obj shares, and each change is recorded through record_edit.
 
     Attributes:
-    checks (list): Initialised to 0s, a 'counter' list for all ticks for each subject where each subject corresponds to an index (hence, range(len(SUBJECTS))).
     tick_img (pygame.Surface): An image of a tick, stored as a pygame surface.
-    tick_marks (dict): Indexes for each key correspond with the checks list. Each key is the subject while each value is the amount of ticks attributed to that subject.
+    strips (dict): The ticks of a row pre-rendered as one surface, keyed by the amount of ticks.
+    tick_marks (Tick_counter): The amount of ticks attributed to each subject (shared with the loaded Planner).
+    history (Tick_history): Every change made to tick_marks (shared with the loaded Planner).
     box_rects (list) : A list of all the rects for each subject's task box.
+    hit_index (Hit_index): Hit-test index of the subjects' boxes.
     '''
     def __init__(self, tick_img : pygame.surface.Surface):
         '''
-        Initialises all empty (to be updated) check counters and tick mark lists and dict. 
+        Initialises the empty (to be updated) tick counter and the subjects' boxes.
 
         Parameter:
         tick_img (pygame.Surface): A valid surface image of a tick.
         '''
-        self.checks = [0 for _ in range(len(SUBJECTS))] #Note: This is technically redundant, as tick_marks stores these values nevertheless, but reduces complexity when displaying.
         self.tick_img = tick_img
-        self.tick_marks = {}
-        for i in range(len(SUBJECTS)):
-            self.tick_marks[SUBJECTS[i]] = self.checks[i]
-        self.box_rects = [pygame.Rect(WIDTH//2, i*50, WIDTH//2, HEIGHT//len(SUBJECTS)) for i in range(len(SUBJECTS))]
+        self.strips = {}
+        self.tick_marks = Tick_counter()
+        self.history = Tick_history()
+        self.layout()
 
+    def layout(self):
+        #Organises a row for each subject, done again if the subjects are changed in the config.
+        self.hit_index = Hit_index({"subjects": Hit_grid(WIDTH//2, 0, WIDTH//2, HEIGHT//len(SUBJECTS), 1, len(SUBJECTS))})
+        self.box_rects = self.hit_index.grids["subjects"].rects()
+
+    def set_ticks(self, index : int, count : int):
+        '''
+        Changes the amount of ticks of a subject, adding the change to the history and recording the edit in storage.
+
+        Parameters:
+        index (int): Index of the subject in SUBJECTS.
+        count (int): The new amount of ticks.
+        '''
+        old_count = self.tick_marks[SUBJECTS[index]]
+        delta = count - old_count
+        when = input_source.now().timestamp()
+        self.tick_marks[SUBJECTS[index]] = count
+        self.history.add(when, index, delta)
+        self.invalidate(index)
+        record_edit(("tick", SUBJECTS[index], count, when, delta), ("tick", SUBJECTS[index], old_count))
+
+    def invalidate(self, index : int):
+        #Marks the row of a subject (its box and ticks) as dirty.
+        renderer.mark_dirty(pygame.Rect(WIDTH//2, self.box_rects[index].y, WIDTH//2, max(self.box_rects[index].height, self.tick_img.get_height())))
+
+    def get_strip(self, count : int) -> pygame.surface.Surface:
+        #Returns a row of count ticks as one surface, rendering it the first time that amount is shown.
+        if count not in self.strips:
+            strip = pygame.Surface((50*(count - 1) + self.tick_img.get_width(), self.tick_img.get_height()), pygame.SRCALPHA)
+            strip.blits([(self.tick_img, (50*j, 0)) for j in range(count)], doreturn=False)
+            self.strips[count] = convert_surface(strip)
+        return self.strips[count]
+
+    @timed("check_list")
     def draw(self):
         #Draws all the rects and lines for the Checklist.
 
         #Loop to iterate through the tick box rects for each subject.
         for i, box in enumerate(self.box_rects):
             draw_highlighted_rect(screen, box, (0, 0, 0), (0, 0, 0), 1, 1)
-            draw_text(screen, FONT, SUBJECTS[i], (WIDTH//2 + 5, i*50), 20, (255, 255, 255))
+            draw_text(screen, FONT, SUBJECTS[i], (WIDTH//2 + 5, box.y), 20, (255, 255, 255))
             pygame.draw.line(screen, (0, 0, 0), (WIDTH//2 + 100, 0), (WIDTH//2 + 100, HEIGHT), 3)
 
-        #Loop to iterate through the actual tick marks dict and blit the correct amount of tick_imgs procedurally.
-        for i, subject in enumerate(self.tick_marks):
-            for j in range(self.tick_marks[subject]):
-                screen.blit(self.tick_img, ((WIDTH//2 + 100) + 50*j, 50*i))
+        #Every subject's ticks in one batch, each row as the strip for its amount of ticks.
+        screen.blits([(self.get_strip(count), (WIDTH//2 + 100, box.y)) for box, count in zip(self.box_rects, self.tick_marks.counts) if count > 0], doreturn=False)
 
+@timed("draw_highlighted_rect")
 def draw_highlighted_rect(surface : pygame.surface.Surface, rect : pygame.rect.Rect, border_color : tuple, highlight_color : tuple, border_thickness : int, highlight_thickness : int):
     '''
     This Function, given a screen surface and a rect, 'highlights' a border around that rect and draws it to the given surface.
@@ -391,9 +994,468 @@ def draw_highlighted_rect(surface : pygame.surface.Surface, rect : pygame.rect.R
     inner_rect = pygame.Rect(rect.left + border_thickness, rect.top + border_thickness,rect.width - 2 * border_thickness, rect.height - 2 * border_thickness)
     pygame.draw.rect(surface, highlight_color, inner_rect, highlight_thickness)
 
-def draw_text(surface : pygame.surface.Surface, font : pygame.font.Font, text : str, pos : tuple, fontsize : int, color : tuple):
+def get_font(path : str, fontsize : int) -> pygame.font.Font:
+    '''
+    Returns the pygame.Font obj for a font file and size, only parsing the file the first time that pair is asked for.
+
+    Parameters:
+    path (str): A file path of the font file used.
+    fontsize (int): Measure of how big the font should be.
+
+    Returns:
+    pygame.font.Font : The (shared) font obj.
+    '''
+    key = (path, fontsize)
+    if key not in FONTS:
+        FONTS[key] = pygame.font.Font(path, fontsize)
+    return FONTS[key]
+
+def visible_length(path : str, fontsize : int, width : int) -> int:
+    '''
+    Returns how many characters of any text can fit in a width (going by the narrowest character of the font), so
+    text running far off the screen isnt rendered or measured.
+
+    Parameters:
+    path (str): A file path of the font file used.
+    fontsize (int): Measure of how big the font is.
+    width (int): Amount of pixels the text has to fit in.
+
+    Returns:
+    int : The max amount of characters that can be seen.
+    '''
+    key = (path, fontsize)
+    if key not in NARROWEST_CHARACTER:
+        advances = [metrics[4] for metrics in get_font(path, fontsize).metrics(PRINTABLE) if metrics is not None]
+        NARROWEST_CHARACTER[key] = max(1, min(advances, default=1))
+    return max(0, width)//NARROWEST_CHARACTER[key] + 1
+
+class Text_cache:
+    '''
+    A bounded least-recently-used cache of rendered text surfaces, so static labels are only rasterised once
+    rather than every frame.
+
+    Attributes:
+    max_size (int): The max number of surfaces held before the least recently used one is evicted.
+    surfaces (OrderedDict): Rendered surfaces keyed by (font, text, fontsize, color), oldest first.
+    hits (int): Amount of renders served straight from the cache.
+    misses (int): Amount of renders that had to be rasterised.
+    evictions (int): Amount of surfaces dropped to stay within max_size.
+    '''
+    def __init__(self, max_size : int):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font : str, text : str, fontsize : int, color : tuple) -> pygame.surface.Surface:
+        '''
+        Returns the rendered surface of some text, rendering (and caching) it only if it hasnt been seen recently.
+
+        Parameters:
+        font (str): A file path of the font file used.
+        text (str): The string of text that is to be rendered.
+        fontsize (int): Measure of how big the font should be drawn.
+        color (tuple): color of words displayed.
+
+        Returns:
+        pygame.Surface : The rendered text.
+        '''
+        key = (font, text, fontsize, tuple(color))
+        word = self.surfaces.get(key)
+        if word is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key) #Marks as most recently used.
+            return word
+
+        self.misses += 1
+        word = get_font(font, fontsize).render(text, True, color)
+        self.surfaces[key] = word
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False) #Evicts the least recently used surface.
+            self.evictions += 1
+        return word
+
+    def stats(self) -> dict:
+        #Returns the counters of the cache, to be shown or logged.
+        return {"size": len(self.surfaces), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class Assets:
+    '''
+    Loads each image once, converted to the display's pixel format (keeping per-pixel alpha where the image has it),
+    so blitting it doesnt convert it again every time. Images asked for before the display exists are converted
+    the first time they are asked for after it does.
+
+    Attributes:
+    images (dict): The loaded images keyed by file path.
+    converted (set): The file paths of images converted to the display's pixel format.
+    '''
+    def __init__(self):
+        self.images = {}
+        self.converted = set()
+
+    def image(self, path : str) -> pygame.surface.Surface:
+        #Returns the image at path, loading it the first time.
+        if path not in self.images:
+            self.images[path] = pygame.image.load(path)
+        if path not in self.converted and pygame.display.get_surface() is not None:
+            self.images[path] = convert_surface(self.images[path])
+            self.converted.add(path)
+        return self.images[path]
+
+def convert_surface(surface : pygame.surface.Surface) -> pygame.surface.Surface:
+    #Returns a surface converted to the display's pixel format (or the surface itself if there isnt a display yet), keeping per-pixel alpha.
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha() if surface.get_flags() & pygame.SRCALPHA else surface.convert()
+
+class Renderer:
+    '''
+    Retained-mode layer over the screen. Screens mark the regions they have invalidated, and each frame only those
+    regions are redrawn and pushed to the display. If nothing is dirty, the frame isnt drawn or presented at all.
+
+    Attributes:
+    dirty_rects (list): The rects invalidated since the last presented frame.
+    full (bool): True if the whole screen has to be redrawn (eg: after a change of screen).
+    frames_drawn (int): Amount of frames that were actually drawn and presented.
+    frames_skipped (int): Amount of frames skipped because nothing was dirty.
+    '''
+    def __init__(self):
+        self.dirty_rects = []
+        self.full = True
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+
+    def mark_dirty(self, rect : pygame.rect.Rect):
+        #Invalidates a region of the screen so it is redrawn next frame.
+        self.dirty_rects.append(pygame.Rect(rect))
+
+    def mark_all(self):
+        #Invalidates the whole screen.
+        self.full = True
+
+    def mark_text(self, font : str, pos : tuple, fontsize : int, *texts):
+        '''
+        Invalidates the area covered by one or more strings drawn from the same position, typically the text of a box before
+        and after an edit (so removed letters are cleared too).
+
+        Parameters:
+        font (str): A file path of the font file used.
+        pos (tuple): The position of the start of the text as (x, y) values.
+        fontsize (int): Measure of how big the font is drawn.
+        texts (str): The strings of text drawn at pos.
+        '''
+        for text in texts:
+            text = text[:visible_length(font, fontsize, WIDTH - pos[0])]
+            self.mark_dirty(pygame.Rect(pos, get_font(font, fontsize).size(text)))
+
+    def is_dirty(self) -> bool:
+        return self.full or len(self.dirty_rects) > 0
+
+    def begin_frame(self, surface : pygame.surface.Surface) -> bool:
+        '''
+        Starts a frame, clipping all drawing to the dirty regions.
+
+        Parameters:
+        surface (pygame.Surface): Typically the 'screen' that is drawn on.
+
+        Returns:
+        bool : Whether the frame needs to be drawn at all.
+        '''
+        if not self.is_dirty():
+            self.frames_skipped += 1
+            return False
+        if self.full:
+            surface.set_clip(None)
+        else:
+            surface.set_clip(self.dirty_rects[0].unionall(self.dirty_rects[1:]))
+        return True
+
+    def end_frame(self, surface : pygame.surface.Surface):
+        #Removes the clip and pushes only the dirty regions to the display (off-screen surfaces arent presented).
+        surface.set_clip(None)
+        start = time.perf_counter_ns()
+        if surface is not pygame.display.get_surface():
+            pass
+        elif self.full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.dirty_rects)
+        if profiler.enabled:
+            profiler.add("present", time.perf_counter_ns() - start)
+        self.dirty_rects = []
+        self.full = False
+        self.frames_drawn += 1
+
+class Idle_scheduler:
+    '''
+    Decides, each loop, whether the main loop has to run at full frame rate or can block until the next input event
+    or pending timer (whichever comes first). Only used if idle mode is turned on.
+
+    Attributes:
+    enabled (bool): Whether idle waiting is used at all (otherwise events are just polled at FPS).
+    timers (list): Functions that each return the ms until their next timer is due (or None if nothing is pending).
+    last_input (int): The pygame.time.get_ticks() value of the last input event.
+    frames (int): Amount of loops (frames) run.
+    wakes (int): Amount of times the loop woke up from an idle wait.
+    '''
+    def __init__(self, enabled : bool):
+        self.enabled = enabled
+        self.timers = []
+        self.last_input = 0
+        self.frames = 0
+        self.wakes = 0
+
+    def add_timer(self, timer):
+        '''
+        Registers a pending timer, so idle waits never sleep past it.
+
+        Parameter:
+        timer (function): Takes no arguments, returns the ms until the timer is due or None.
+        '''
+        self.timers.append(timer)
+
+    def next_timeout(self) -> int:
+        #Returns the ms until the soonest pending timer is due (at least 1, as a timeout of 0 would wait forever).
+        due = [ms for ms in (timer() for timer in self.timers) if ms is not None]
+        return max(1, min(due)) if due else 60000
+
+    def get_events(self, clock : pygame.time.Clock, busy : bool) -> list:
+        '''
+        Waits for the next frame and returns the events to handle in it. While the user is interacting (or busy is True)
+        this ticks at FPS and polls, otherwise it blocks until an event arrives or a timer is due.
+
+        Parameters:
+        clock (pygame.time.Clock): The clock managing the framerate.
+        busy (bool): True if something (eg: a redraw or button delay) needs the next frame straight away.
+
+        Returns:
+        list : The pygame events to handle this frame.
+        '''
+        self.frames += 1
+        interacting = pygame.time.get_ticks() - self.last_input < INTERACTION_MS
+        if not self.enabled or busy or interacting:
+            clock.tick(FPS) #Framerate is managed.
+            events = pygame.event.get()
+        else:
+            event = pygame.event.wait(self.next_timeout())
+            self.wakes += 1
+            events = pygame.event.get() if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+            clock.tick() #Keeps the measured framerate in step, without delaying.
+
+        for event in events:
+            if event.type in INPUT_EVENTS:
+                self.last_input = pygame.time.get_ticks()
+        return events
+
+    def caption(self, clock : pygame.time.Clock) -> str:
+        #Returns the window caption with the framerate (and frame/wake counts in idle mode).
+        if not self.enabled:
+            return f"Task Manager - {str(int(clock.get_fps()))}"
+        return f"Task Manager - {str(int(clock.get_fps()))} - frames: {self.frames} wakes: {self.wakes}"
+
+class Profiler:
+    '''
+    Per-subsystem timers (see timed), summed up each frame and kept for the last PROFILE_WINDOW frames, shown in an
+    overlay toggled with PROFILE_KEY. Nothing is collected while the overlay is hidden.
+
+    Attributes:
+    enabled (bool): Whether timings are being collected (and the overlay shown).
+    totals (dict): ns spent in each subsystem so far this frame, keyed by name.
+    history (dict): deques of each subsystem's ns per frame, keyed by name.
+    frame_times (deque): ns spent working on each frame (not including waiting for the next one).
+    frame_start (int): The time.perf_counter_ns() value when the current frame started.
+    rect (pygame.Rect): Where the overlay is drawn.
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.totals = {}
+        self.history = {}
+        self.frame_times = deque(maxlen=PROFILE_WINDOW)
+        self.frame_start = time.perf_counter_ns()
+        self.rect = pygame.Rect(WIDTH - 310, 60, 300, 380)
+
+    def toggle(self):
+        #Turns profiling on or off, starting over with empty timings.
+        self.enabled = not self.enabled
+        self.totals.clear()
+        self.history.clear()
+        self.frame_times.clear()
+
+    def add(self, name : str, ns : int):
+        #Adds time spent in a subsystem to the current frame.
+        self.totals[name] = self.totals.get(name, 0) + ns
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter_ns()
+
+    def end_frame(self):
+        #Moves the current frame's timings into the history.
+        if not self.enabled:
+            return
+        self.frame_times.append(time.perf_counter_ns() - self.frame_start)
+        for name in self.totals.keys() - self.history.keys():
+            self.history[name] = deque(maxlen=PROFILE_WINDOW)
+        for name, times in self.history.items():
+            times.append(self.totals.get(name, 0))
+        self.totals.clear()
+
+    def averages(self) -> dict:
+        #Returns the average ms spent in each subsystem per frame, slowest first.
+        averages = {name: sum(times)/len(times)/1e6 for name, times in self.history.items()}
+        return dict(sorted(averages.items(), key=lambda item: item[1], reverse=True))
+
+    def histogram(self) -> list:
+        #Returns the amount of frames that took up to each of FRAME_BINS ms (and then any longer) to work on.
+        counts = [0]*(len(FRAME_BINS) + 1)
+        for ns in self.frame_times:
+            counts[bisect.bisect_left(FRAME_BINS, ns/1e6)] += 1
+        return counts
+
+    def draw(self, surface : pygame.surface.Surface):
+        '''
+        Draws the overlay: the average frame time and time per subsystem, the text cache and font registry stats and a
+        histogram of frame times. Text is rendered without the text cache, as the numbers would only fill it up.
+
+        Parameter:
+        surface (pygame.Surface): Typically the 'screen' that the overlay is drawn on.
+        '''
+        font = get_font(None, 20)
+        frame = sum(self.frame_times)/len(self.frame_times)/1e6 if self.frame_times else 0
+        stats = text_cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        lines = [f"frame {frame:.2f}ms (last {len(self.frame_times)})"]
+        lines += [f"{name} {ms:.3f}ms" for name, ms in self.averages().items()]
+        lines.append(f"text cache {stats['size']}/{text_cache.max_size} hits {100*stats['hits']//max(1, lookups)}% evictions {stats['evictions']}")
+        lines.append(f"fonts {len(FONTS)}")
+
+        panel = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 200))
+        for i, line in enumerate(lines[:(self.rect.height - 70)//18]):
+            panel.blit(font.render(line, True, (255, 255, 255)), (5, 5 + i*18))
+
+        #Histogram along the bottom, with each bar's height relative to the fullest one.
+        counts = self.histogram()
+        bar_width = self.rect.width//len(counts)
+        labels = [f"<{ms}" for ms in FRAME_BINS] + [f">{FRAME_BINS[-1]}"]
+        for i, count in enumerate(counts):
+            height = 40*count//max(1, max(counts))
+            pygame.draw.rect(panel, (0, 200, 0), (i*bar_width + 2, self.rect.height - 20 - height, bar_width - 4, height))
+            panel.blit(font.render(labels[i], True, (255, 255, 255)), (i*bar_width + 4, self.rect.height - 18))
+        surface.blit(panel, self.rect)
+
+class Startup_profile:
+    '''
+    Times each step of starting up, from the module being imported until the first frame has been presented and the
+    data has been loaded (whichever comes last). Reported with --startup-profile.
+
+    Attributes:
+    marks (list): Each step as (name, time.perf_counter() value when it finished), in the order they finished.
+    '''
+    def __init__(self):
+        self.marks = [("start", STARTED_AT)]
+
+    def mark(self, step : str):
+        #Records a step finishing now, unless it already has.
+        if all(name != step for name, _ in self.marks):
+            self.marks.append((step, time.perf_counter()))
+
+    def done(self, steps : int) -> bool:
+        return len(self.marks) > steps
+
+    def report(self) -> str:
+        #Returns how long each step took and the time until the first frame.
+        steps = ", ".join(f"{step} {(end - start)*1000:.1f}ms" for (_, start), (step, end) in zip(self.marks, self.marks[1:]))
+        first_frame = dict(self.marks).get("first frame", self.marks[-1][1])
+        return f"Startup: {steps} (first frame after {(first_frame - STARTED_AT)*1000:.1f}ms)"
+
+class Input_source:
+    '''
+    Where the app reads the state of the mouse and the current time from. This one reads them live from pygame and
+    the system clock, a replayed session (see replay.py) swaps in one that returns the recorded values instead.
+    '''
+    def get_pos(self) -> tuple:
+        #Returns the mouse's position as (x, y) values.
+        return pygame.mouse.get_pos()
+
+    def get_pressed(self) -> tuple:
+        #Returns whether the (left, middle, right) mouse buttons are held down.
+        return pygame.mouse.get_pressed()
+
+    def now(self) -> datetime.datetime:
+        #Returns the current date and time.
+        return datetime.datetime.now()
+
+class Input_recorder:
+    '''
+    Records a session to a compact event log, which replay.py can play back. The first line holds the time the session
+    started, then there is one JSON line per frame with input events in it:
+    [frame, ms since the start, [mouse x, mouse y], [left, middle, right pressed], [[event type, {event attributes}], ...]]
+
+    Attributes:
+    file (file): The log being written to.
+    source (Input_source): Where the mouse state of each frame is read from.
+    start_ticks (int): The pygame.time.get_ticks() value when recording started.
+    frames (int): Amount of frames written to the log.
+    '''
+    def __init__(self, path : str, source : Input_source):
+        self.file = open(path, "w")
+        self.source = source
+        self.start_ticks = pygame.time.get_ticks()
+        self.frames = 0
+        header = {"version": 1, "start": source.now().isoformat()}
+        self.file.write(json.dumps(header) + "\n")
+
+    def record(self, frame : int, events : list):
+        '''
+        Writes out the events of a frame, along with the mouse state they were handled with (frames without any input are skipped).
+
+        Parameters:
+        frame (int): The number of the frame in the main loop.
+        events (list): The pygame events handled in the frame.
+        '''
+        events = [event for event in events if event.type in RECORDED_EVENTS]
+        if not events:
+            return
+        line = [frame, pygame.time.get_ticks() - self.start_ticks, list(self.source.get_pos()), list(self.source.get_pressed()[:3]),
+                [[event.type, {k: v for k, v in event.dict.items() if isinstance(v, (bool, int, float, str, tuple))}] for event in events]]
+        self.file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.frames += 1
+
+    def close(self):
+        self.file.close()
+
+FONTS = {} #Font registry, keyed by (path, size).
+NARROWEST_CHARACTER = {} #Width of the narrowest character of each font, keyed by (path, size).
+text_cache = Text_cache(TEXT_CACHE_SIZE)
+assets = Assets()
+renderer = Renderer()
+profiler = Profiler()
+input_source = Input_source() #Replaced when replaying a recorded session.
+config_watcher = None #Watches CONFIG_FILE for edits, set in main (headless runs keep the config they started with).
+search_index = Search_index() #Built the first time the Search screen is opened.
+undo_history = Undo_history() #The edits Ctrl+Z undoes.
+
+def record_edit(record : tuple, inverse=None, join=False):
+    '''
+    Saves an edit to storage and keeps the search index up to date with it.
+
+    Parameters:
+    record (tuple): The edit, as a journal record (see Journal).
+    inverse (tuple): The journal record that undoes the edit, if it can be undone (see Undo_history).
+    join (bool): If True, the edit is undone along with the edit before it.
+    '''
+    storage.write(record)
+    if search_index.built:
+        search_index.apply_record(record)
+    if inverse is not None:
+        undo_history.push(record, inverse, input_source.now().timestamp(), join)
+
+@timed("draw_text")
+def draw_text(surface : pygame.surface.Surface, font : str, text : str, pos : tuple, fontsize : int, color : tuple):
     '''
     Given information on text and font, this function draws a string of text as a pygame surface.
+    The font and rendered text are reused from the font registry and text cache where possible.
 
     Parameters:
     surface (pygame.Surface): Typically the 'screen' that the rect is meant to be drawn on.
@@ -403,10 +1465,11 @@ def draw_text(surface : pygame.surface.Surface, font : pygame.font.Font, text :
     fontsize (int): Measure of how big the font should be drawn.
     color (tuple): color of words displayed.
     '''
-    font = pygame.font.Font(font, fontsize) # Font is reassigned as a pygame.Font obj to be blit.
-    word = font.render(text, True, color)
+    text = text[:visible_length(font, fontsize, surface.get_width() - pos[0])] #Only what can be seen is rendered.
+    word = text_cache.render(font, text, fontsize, color)
     surface.blit(word, (pos[0], pos[1])) #word blit at right position in given font.
 
+@timed("today")
 def today(calendar):
     '''
     Function to draw the today screen, given information from the calendar obj. Acts as a slight shortcut for the calendar.
@@ -416,12 +1479,12 @@ def today(calendar):
     '''
 
     #The same as day_window's blit (as it is essentially just the same screen, just for today).
-    calendar.selected_day = calendar.day - 1
-    draw_text(screen, FONT, f"{str(MONTHS[calendar.current_month - 1])} {str(calendar.selected_day + 1)}", (10, 0), 65, (100, 100, 100))
+    date = input_source.now().date()
+    draw_text(screen, FONT, f"{str(MONTHS[date.month - 1])} {str(date.day)}", (10, 0), 65, (100, 100, 100))
     current_pos = [0, 70]
-    for task in calendar.month_data[MONTHS[calendar.current_month - 1]][calendar.selected_day]:
+    for task, rule_index in calendar.get_entries(date):
         pygame.draw.line(screen, (0, 0, 0), current_pos, (WIDTH, current_pos[1]), 5)
-        draw_text(screen, FONT, task, current_pos, HEIGHT//6, (55, 68, 100))
+        draw_text(screen, FONT, task, current_pos, HEIGHT//6, TASK_COLOR if rule_index is None else RECURRING_COLOR)
         current_pos[1] += 70
 
 def reset_buttons(buttons : list):
@@ -435,6 +1498,10 @@ def reset_buttons(buttons : list):
         button.clicked_ticks = 0
         button.clicked = False
 
+def buttons_cooling(buttons : list) -> bool:
+    #Returns True if any button is still in its one second click delay (which is counted in frames).
+    return any(button.clicked_ticks < FPS for button in buttons)
+
 def increment_button_ticks(buttons : list):
     '''
     Increments all button's ticks by one, as long they havent been clicked for a second.
@@ -447,293 +1514,684 @@ def increment_button_ticks(buttons : list):
         if button.clicked_ticks < FPS: #Uses FPS to ensure only close to a second is there for button delay.
             button.clicked_ticks += 1
 
-def split_list(input_list, chunk_size):
-    '''
-    Splits a list in chunk_size parts.
-
-    Parameters:
-    input_list (list): The given list of items.
-    chunk_size (int): A size of the chunks of the list.
+storage = Pickle_storage("data.pickle") #Replaced in main, based on STORAGE.
 
-    Returns:
-    A 2 dimensional list, where each 'chunk' is a sub list, comprising of chunk_size parts of input_list in order
-    of original list. If chunk_size >= len(input_list), then a list of the original list is returned.Negative  
-    chunk sizes return an empty list.
+@timed("load_data")
+def load_data(default : dict) -> dict:
     '''
-    return [input_list[i:i + chunk_size] for i in range(0, len(input_list), chunk_size)]
+    Loads data from storage and returns it.
 
-def load_data():
-    #Loads data from the data.pickle file and returns it.
-    try:
-        with open('data.pickle', 'rb') as f:
-            data = pickle.load(f)
-            return data
-    except EOFError: 
-        return "" # For a potential error an empty string is returned.
+    Parameter:
+    default (dict): The data to use for anything that hasnt been saved yet.
+    '''
+    return storage.load(default)
     
 def clear_savedata():
-    #Clears all data from data.pickle. WARNING : BE CAREFUL OF USE, THIS DELETES ALL THE CONTENTS OF THE FILE.
-    with open("data.pickle", "wb") as _:
-        pass
+    #Clears all saved data. WARNING : BE CAREFUL OF USE, THIS DELETES ALL THE CONTENTS OF THE FILE.
+    storage.clear()
 
-def save(objects, tasks, calendar):
+class App:
     '''
-    Saves all data needed (this is specified beforehand and is constant).
+    Holds all main objs and the state of the app, handling it one event and one frame at a time. The main loop
+    drives it from the pygame window, but it can just as well be driven headlessly (eg: by benchmark.py).
 
-    Parameters:
+    Only the Menu screen is built straight away, the Tasks and Calendar objs are built the first time they are needed.
+
+    Attributes:
+    tasks (Tasks): The Tasks obj (a property, building it if it hasnt been yet).
+    checklist (Check_list): The Check_list obj.
+    calendar (Calendar): The Calendar obj (a property, building it if it hasnt been yet).
+    menu (Menu): The Menu obj.
+    search (Search): The Search obj.
+    stats (Stats): The Stats obj.
     objects (dict): dict of some objects that use string names to easily refer to the objs themselves.
-    tasks (Tasks): The Tasks obj.
-    calendar (Calendar): The Calendar obj.
-    '''
-    with open("data.pickle", "wb") as f:
-        #Previously set, recorded data.
-        data = {
-            "checks": objects["check_list"].checks, 
-            "tick_marks": objects["check_list"].tick_marks,
-            "tasks": tasks.tasks,
-            "notes": tasks.notes,
-            "month_data": calendar.month_data
-        }
-        pickle.dump(data, f) #Puts the data dict in the pickle file.
-    f.close() #Close the file.
-
-def main(screen):
+    menu_buttons (list): The buttons on the Menu screen.
+    buttons (list): All buttons as Button objs.
+    current_state (str): The screen being shown ("menu", "tasks", "calendar", "today", "search" or "stats").
+    editing (bool): True while a text box is being typed in.
+    edit_buffer (Edit_buffer): The text (and cursor) of the box being typed in.
+    running (bool): False once the app has been closed.
+    last_view (tuple): What was shown last frame, to know when the whole screen needs redrawing.
+    last_editing (bool): Whether the editing dot was shown last frame.
+    planner (Planner): The loaded data, which the objs share, None until it has been loaded.
+    loader (threading.Thread): The worker thread loading the data, if start_loading was used and it hasnt been waited on.
+    loaded (tuple): The data (or the exception raised) read by the loader.
+    reminders (Reminder_queue): The upcoming reminders, each posted as a REMINDER_EVENT once it is due.
+    reminder (str): The reminder being shown, None if there isnt one.
+    reminder_until (datetime.datetime): When the reminder being shown is hidden.
     '''
-    This Function corroborates all classes, methods and other functions into one main pygame loop.
-    Along with most of the main definitions of variables.
+    def __init__(self, tick_img : pygame.surface.Surface):
+        '''
+        Initialises all main objs, buttons and set states.
 
-    Parameter:
-    screen (pygame.Surface): The main screen everything will be blit on.
-    '''
+        Parameter:
+        tick_img (pygame.Surface): A valid surface image of a tick.
+        '''
+        #Definition of all main objs (the Tasks and Calendar objs are built on first use).
+        self._tasks = None
+        self.checklist = Check_list(tick_img)
+        self._calendar = None
+        self.menu = Menu()
+        self.search = Search()
+        self.stats = Stats()
+        self.objects = {"menu": self.menu, "check_list": self.checklist}
+
+        #Definition of all buttons.
+        self.calendar_button = Button(175, 295, 325, 75, "Calendar", 75, textcolor=(100, 100, 100), bordercolor=(0, 0, 0))
+        self.today_button = Button(175, 230, 325, 75, "Today", 75, textcolor=(100, 100, 100), bordercolor=(0, 0, 0))
+        self.tasks_button = Button(175, 165, 325, 75, "Tasks", 75, textcolor=(100, 100, 100), bordercolor=(0, 0, 0))
+        self.search_button = Button(175, 100, 325, 75, "Search", 75, textcolor=(100, 100, 100), bordercolor=(0, 0, 0))
+        self.calendar_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
+        self.tasks_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
+        self.today_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
+        self.day_window_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
+        self.search_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
+        self.stats_button = Button(15, 100, 150, 75, "Stats", 45, textcolor=(100, 100, 100), bordercolor=(0, 0, 0))
+        self.stats_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
+
+        #Definition of some important lists of buttons.
+        self.menu_buttons = [self.calendar_button, self.today_button, self.tasks_button, self.search_button, self.stats_button]
+        self.buttons = [self.calendar_button, self.today_button, self.tasks_button, self.search_button, self.stats_button, self.calendar_back_button,
+                        self.tasks_back_button, self.today_back_button, self.day_window_back_button, self.search_back_button, self.stats_back_button]
+
+        #Initial set states.
+        self.current_state = "menu"
+        self.editing = False
+        self.edit_buffer = Edit_buffer()
+        self.running = True
+        self.last_view = None
+        self.last_editing = False
+        self.planner = None
+        self.loader = None
+        self.loaded = None
+        self.reminders = Reminder_queue()
+        self.reminders.plan_day(input_source.now().date(), input_source.now())
+        self.reminder = None
+        self.reminder_until = None
+
+    @property
+    def tasks(self) -> Tasks:
+        if self._tasks is None:
+            self._tasks = Tasks(MAX_TASKS)
+            if self.planner is not None:
+                self._tasks.set_lists(self.planner.tasks, self.planner.notes)
+        return self._tasks
+
+    @property
+    def calendar(self) -> Calendar:
+        if self._calendar is None:
+            self._calendar = Calendar()
+            if self.planner is not None:
+                self._calendar.store = self.planner.store
+                self._calendar.rules = self.planner.rules
+        return self._calendar
+
+    def get_data(self) -> dict:
+        #Returns all data needed to be saved, in the format it is saved in (see Planner.to_data).
+        self.wait_loaded()
+        planner = self.planner if self.planner is not None else Planner(default_data())
+        return planner.to_data()
+
+    def load(self):
+        #loads saved data, anything not yet saved keeps its initial value.
+        self.apply_data(load_data(default_data()))
+
+    def start_loading(self):
+        #Loads saved data on a worker thread, so the Menu can be drawn in the meantime (see wait_loaded).
+        default = default_data()
+        def read():
+            try:
+                self.loaded = (load_data(default), None)
+            except Exception as e:
+                self.loaded = (None, e)
+        self.loader = threading.Thread(target=read, daemon=True)
+        self.loader.start()
+
+    def wait_loaded(self):
+        #Waits for the worker thread started by start_loading (if any) and uses the data it read.
+        if self.loader is None:
+            return
+        self.loader.join()
+        self.loader = None
+        data, error = self.loaded
+        self.loaded = None
+        if error is not None:
+            raise error
+        self.apply_data(data)
+
+    def apply_data(self, data : dict):
+        #Hands loaded data to the objs (the Tasks and Calendar objs pick it up when they are built).
+        self.planner = planner = Planner(data)
+        self.checklist.tick_marks = planner.tick_marks
+        self.checklist.history = planner.history
+        if self._tasks is not None:
+            self._tasks.set_lists(planner.tasks, planner.notes)
+        if self._calendar is not None:
+            self._calendar.store = planner.store
+            self._calendar.rules = planner.rules
+        search_index.built = False #Rebuilt from the new data when next searched.
+        undo_history.clear()
+        renderer.mark_all()
+
+    @timed("events")
+    def handle_event(self, event : pygame.event.Event):
+        '''
+        Handles a single event for whichever screen is being shown.
+
+        Parameter:
+        event (pygame.event.Event): The event to handle.
+        '''
+        self.wait_loaded() #Events may edit the data, so it has to be there first.
+        objects = self.objects
+
+        if event.type == pygame.QUIT:
+            self.running = False
+            self.edit_buffer.flush()
+            storage.close(self.get_data())
+
+        #Reminders (and clicking them away) are handled the same on any screen.
+        if event.type == REMINDER_EVENT:
+            self.remind(event.kind, event.text, event.date)
+            return
+        if event.type == pygame.MOUSEBUTTONDOWN and self.reminder is not None and REMINDER_RECT.collidepoint(event.pos):
+            self.hide_reminder()
+            return
+
+        #Ctrl+Z undoes the last edit and Ctrl+Y (or Ctrl+Shift+Z) redoes it, from any screen.
+        if event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL and event.key in (pygame.K_z, pygame.K_y):
+            self.undo(redo=event.key == pygame.K_y or bool(event.mod & pygame.KMOD_SHIFT))
+            return
+
+        #Shows or hides the profiling overlay, from any screen.
+        if event.type == pygame.KEYDOWN and event.key == PROFILE_KEY:
+            profiler.toggle()
+            renderer.mark_all()
+            return
+
+        #The window was uncovered or restored, so its contents have to be redrawn.
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+            renderer.mark_all()
+
+        #For the main menu
+        if self.current_state == "menu":
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:
+                    #Updates now_rect, next_rect and time based on a left mouse click on the now_rect.
+                    if objects["menu"].now_rect.collidepoint(event.pos):
+                        objects["menu"].refresh()
+                        objects["menu"].invalidate()
+                        
+                    else:
+                        #Otherwise look for collisions in the check_list.
+                        _, i = objects["check_list"].hit_index.hit(event.pos)
+                        if i is not None:
+                            if objects["check_list"].tick_marks[SUBJECTS[i]] < MAX_TICKS:
+                                objects["check_list"].set_ticks(i, objects["check_list"].tick_marks[SUBJECTS[i]] + 1) #increments a tick as long as there are less than MAX_TICKS.
+
+                    #Checks for clicks on the menu buttons and updates the state accordingly.
+                    #Note : This can be done more efficiently through simple iteration but the foreseen addition of an attribute may complicate things.
+                    for button in self.menu_buttons:
+                        button.get_clicked()
+                    if self.menu_buttons[2].clicked:
+                        self.current_state = "tasks"
+
+                    elif self.menu_buttons[1].clicked:
+                        self.current_state = "today"
+
+                    elif self.menu_buttons[0].clicked:
+                        self.current_state = "calendar"
+
+                    elif self.menu_buttons[3].clicked:
+                        self.open_search()
+
+                    elif self.menu_buttons[4].clicked:
+                        self.stats.refresh(self.checklist.history)
+                        self.current_state = "stats"
+
+                #Otherwise checks for right clicks on the check_list rects and decrements it by one if detected.
+                elif event.button == 3:
+                    _, i = objects["check_list"].hit_index.hit(event.pos)
+                    if i is not None:
+                        if objects["check_list"].tick_marks[SUBJECTS[i]] > 0:
+                            objects["check_list"].set_ticks(i, objects["check_list"].tick_marks[SUBJECTS[i]] - 1)
+        #For the tasks screen.
+        elif self.current_state == "tasks":
+            tasks = self.tasks
+
+            #Back button check.
+            self.tasks_back_button.get_clicked()
+            if self.tasks_back_button.clicked and not self.editing:
+                self.current_state = "menu"
+                reset_buttons(self.buttons)
+
+            #Based on checked mouseclick, 'boxes_info' is updated as to select a paticular note or task box.    
+            boxes_info = tasks.check_mouseclick()
+
+            if boxes_info[0]:
+                self.edit_tasks_box(boxes_info[1], boxes_info[2])
+
+            #Typing events when editing the interactable text boxes (essentially the same as calendar's checks below).
+            elif event.type == pygame.KEYDOWN and self.editing:
+                if event.key == pygame.K_ESCAPE:
+                    self.stop_editing()
+                else:
+                    self.edit_buffer.handle_key(event)
+
+            elif event.type == pygame.TEXTINPUT and self.editing:
+                self.edit_buffer.insert(event.text)
+
+            #Scrolling the rows with the mouse wheel or page up/down (which finishes typing, as the box moves).
+            elif event.type == pygame.MOUSEWHEEL:
+                self.stop_editing()
+                tasks.scroll_to(tasks.scroll - event.y*SCROLL_ROWS)
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                tasks.scroll_to(tasks.scroll + (tasks.rows if event.key == pygame.K_PAGEDOWN else -tasks.rows))
+
+        #For the calendar scereen.
+        elif self.current_state == "calendar":
+            calendar = self.calendar
+
+            #Back button check.
+            self.calendar_back_button.get_clicked()
+            self.day_window_back_button.get_clicked()
+            if self.calendar_back_button.clicked and not calendar.day_window:
+                self.current_state = "menu"
+                reset_buttons(self.buttons)
+
+            elif self.day_window_back_button.clicked and calendar.day_window and not self.editing:
+                calendar.selected_day = None
+                calendar.day_window = False
+                self.current_state = "calendar"
+                reset_buttons(self.buttons)
+
+            #Typing events when editing the interactable text boxes.
+            elif event.type == pygame.KEYDOWN and self.editing:
+                if event.key == pygame.K_ESCAPE:
+                    self.stop_editing()
+                    calendar.commit_rule(calendar.selected_task)
+                else:
+                    self.edit_buffer.handle_key(event)
 
-    #Definition of all main objs.
-    tasks = Tasks(10)
-    checklist = Check_list(pygame.image.load(os.path.join("images", "tick_mark.png")))
-    calendar = Calendar()
-    menu = Menu()
-
-    #loads data from data.pickle, if it exists and isnt empty.
-    if os.path.exists("data.pickle"):
-        data = load_data()
-        if data != "":
-            data = load_data()
-            checklist.checks = data["checks"]
-            checklist.tick_marks = data["tick_marks"]
-            tasks.tasks = data["tasks"]
-            tasks.notes = data["notes"]
-            calendar.month_data = data["month_data"]
-
-    #Definition of all buttons.
-    calendar_button = Button(175, 295, 325, 75, "Calendar", 75, textcolor=(100, 100, 100), bordercolor=(0, 0, 0))
-    today_button = Button(175, 230, 325, 75, "Today", 75, textcolor=(100, 100, 100), bordercolor=(0, 0, 0))
-    tasks_button = Button(175, 165, 325, 75, "Tasks", 75, textcolor=(100, 100, 100), bordercolor=(0, 0, 0))
-    calendar_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
-    tasks_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
-    today_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
-    day_window_back_button = Button(WIDTH - 125, 0, 125, HEIGHT//10, "Back", 50, textcolor=(100, 0, 0), bordercolor=(0, 0, 0), thickness=3)
-
-    #Definition of some important lists of buttons and other objs.
-    menu_buttons = [calendar_button, today_button, tasks_button]
-    objects = {"menu": menu, "check_list": checklist}
-    buttons = [calendar_button, today_button, tasks_button, calendar_back_button, tasks_back_button, today_back_button, day_window_back_button]
-
-    #Initial set states.
-    current_state = "menu"
-    editing = False
-    editing_index = None
-    editing_list = None
+            elif event.type == pygame.TEXTINPUT and self.editing:
+                self.edit_buffer.insert(event.text)
 
-    #Pygame clock to record framerate.
-    clock = pygame.time.Clock()
-    running = True
-    while running:
-        clock.tick(FPS) #Framerate is managed.
-        increment_button_ticks(buttons) #All button's ticks incremneted at the start of the loop.
-        pygame.display.set_caption(f"Task Manager - {str(int(clock.get_fps()))}") #Updates caption based on framerate.
-        screen.fill((50, 50, 50)) #Background of the screen.
+            #To traverse the months (and years) based on arrow keys.            
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    calendar.change_month(-1)
+
+                elif event.key == pygame.K_RIGHT:
+                    calendar.change_month(1)
+
+            #Checks for mouse collisions with the task rect and sets selected indexes accordingly.
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:
+                    if not calendar.day_window:
+                        _, index = calendar.get_day_index().hit(event.pos)
+                        if index is not None:
+                            calendar.selected_day = index
+                            calendar.day_window = True
 
-        #Event check
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                save(objects, tasks, calendar)
-
-            #For the main menu
-            if current_state == "menu":
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:
-                        #Updates now_rect, next_rect and time based on a left mouse click on the now_rect.
-                        if objects["menu"].now_rect.collidepoint(event.pos):
-                            time = str(datetime.datetime.now())[11:16]
-                            day = DAYS[datetime.datetime.now().weekday()]
-                            day_type = "Weekday" if day in WEEKDAYS else "Weekend" if day in WEEKENDS else "Intervention"
-                            objects["menu"].now_text = objects["menu"].update_now(TIMETABLE[day_type], time)[0]
-                            objects["menu"].next_text = objects["menu"].update_now(TIMETABLE[day_type], time)[1]
-                            objects["menu"].time = objects["menu"].update_now(TIMETABLE[day_type], time)[2]
-                            
-                        else:
-                            #Otherwise look for collisions in the check_list.
-                            for i, box in enumerate(objects["check_list"].box_rects):
-                                if box.collidepoint(event.pos):
-                                    if objects["check_list"].tick_marks[SUBJECTS[i]] <= 7:
-                                        objects["check_list"].tick_marks[SUBJECTS[i]] += 1 #increments a tick as long as it is <= 7.
-
-                        #Checks for clicks on the menu buttons and updates the state accordingly.
-                        #Note : This can be done more efficiently through simple iteration but the foreseen addition of an attribute may complicate things.
-                        for button in menu_buttons:
-                            button.get_clicked()
-                        if menu_buttons[2].clicked:
-                            current_state = "tasks"
-
-                        elif menu_buttons[1].clicked:
-                            current_state = "today"
-
-                        elif menu_buttons[0].clicked:
-                            current_state = "calendar"
-
-                    #Otherwise checks for right clicks on the check_list rects and decrements it by one if detected.
-                    elif event.button == 3:
-                        for i, box in enumerate(objects["check_list"].box_rects):
-                                if box.collidepoint(event.pos):
-                                    if objects["check_list"].tick_marks[SUBJECTS[i]] > 0:
-                                        objects["check_list"].tick_marks[SUBJECTS[i]] -= 1
-            #For the tasks screen.
-            elif current_state == "tasks":
-
-                #Back button check.
-                tasks_back_button.get_clicked()
-                if tasks_back_button.clicked and not editing:
-                    current_state = "menu"
-                    reset_buttons(buttons)
-
-                #Based on checked mouseclick, 'boxes_info' is updated as to select a paticular note or task box.    
-                boxes_info = tasks.check_mouseclick()
-
-                if boxes_info[0]:
-                    editing = True
-                    if boxes_info[1] == "notes":
-                        editing_index = boxes_info[2]
-                        editing_list = tasks.notes
-                        editing_notesortasks = "notes"
-                    elif boxes_info[1] == "tasks":
-                        editing_index = boxes_info[2]
-                        editing_list = tasks.tasks
-                        editing_notesortasks = "tasks"
-
-                #Typing events when editing the interactable text boxes (essentially the same as calendar's checks below).
-                elif event.type == pygame.KEYDOWN and editing:
-                    if event.key == pygame.K_ESCAPE:
-                        editing = False
-                        editing_index = None
-                        editing_list = None
-                    
-                    else:
-                        if event.key == pygame.K_BACKSPACE:
-                            editing_list[editing_index] = editing_list[editing_index][:-1]
-                        else:
-                            editing_list[editing_index] += event.unicode
-
-                        if editing_notesortasks == "notes":
-                            tasks.notes = editing_list
-                        else:
-                            tasks.tasks = editing_list
-
-            #For the calendar scereen.
-            elif current_state == "calendar":
-
-                #Back button check.
-                calendar_back_button.get_clicked()
-                day_window_back_button.get_clicked()
-                if calendar_back_button.clicked and not calendar.day_window:
-                    current_state = "menu"
-                    reset_buttons(buttons)
-
-                elif day_window_back_button.clicked and calendar.day_window and not editing:
-                    calendar.selected_day = None
-                    calendar.day_window = False
-                    current_state = "calendar"
-                    reset_buttons(buttons)
-
-                #Typing events when editing the interactable text boxes.
-                elif event.type == pygame.KEYDOWN and editing:
-                    if event.key == pygame.K_ESCAPE:
-                        editing = False
                     else:
-                        if event.key == pygame.K_BACKSPACE:
-                            #Removes the last piece of text if backspace is clicked.
-                            calendar.month_data[MONTHS[calendar.current_month - 1]][calendar.selected_day][calendar.selected_task] = calendar.month_data[MONTHS[calendar.current_month - 1]][calendar.selected_day][calendar.selected_task][:-1]
-                        else:
-                            #Otherwise, for any other letter, it is added on to the string at the specified selected indexes in month data.
-                            calendar.month_data[MONTHS[calendar.current_month - 1]][calendar.selected_day][calendar.selected_task] += event.unicode
-
-                #To traverse the months of 2024 based on arrow keys.            
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT:
-                        if calendar.current_month > 1:
-                            calendar.current_month -= 1  
-
-                    elif event.key == pygame.K_RIGHT:
-                        if calendar.current_month < 12:
-                            calendar.current_month += 1
-
-                #Checks for mouse collisions with the task rect and sets selected indexes accordingly.
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:
-                        if not calendar.day_window:
-                            for day_rect in calendar.day_rects[MONTHS[calendar.current_month - 1]]:
-                                if day_rect.collidepoint(event.pos):
-                                    index = calendar.day_rects[MONTHS[calendar.current_month - 1]].index(day_rect)
-                                    calendar.selected_day = index
-                                    calendar.day_window = True
-
-                        else:
-                            for task_rect in split_list(calendar.task_rects[MONTHS[calendar.current_month - 1]], 6)[calendar.selected_day]:
-                                if task_rect.collidepoint(event.pos):
-                                    index = split_list(calendar.task_rects[MONTHS[calendar.current_month - 1]], 6)[calendar.selected_day].index(task_rect)
-                                    calendar.selected_task = index
-                                    editing = True
-            
-            #For the today screen.
-            elif current_state == "today":
-
-                #Back button check. 
-                today_back_button.get_clicked()
-                if today_back_button.clicked:
-                    calendar.selected_day = None
-                    current_state = "menu"
-                    reset_buttons(buttons)
+                        _, index = calendar.task_index.hit(event.pos)
+                        if index is not None:
+                            if self.editing and index != calendar.selected_task:
+                                self.edit_buffer.close() #The rule is read from the box, so its text is set first.
+                                calendar.commit_rule(calendar.selected_task)
+                            calendar.selected_task = index
+                            self.edit_day_box(index)
+
+                #Right clicking a recurring entry in the day window removes it (from every day).
+                elif event.button == 3 and calendar.day_window and not self.editing:
+                    _, index = calendar.task_index.hit(event.pos)
+                    if index is not None:
+                        calendar.remove_rule(index)
+        
+        #For the search screen.
+        elif self.current_state == "search":
+            search = self.search
+
+            #Back button check.
+            self.search_back_button.get_clicked()
+            if self.search_back_button.clicked or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                self.current_state = "menu"
+                reset_buttons(self.buttons)
+
+            #Typing edits the query, which is searched again on every key.
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE:
+                search.set_query(search.query[:-1])
+            elif event.type == pygame.TEXTINPUT and event.text.isprintable():
+                search.set_query(search.query + event.text)
+
+            #Clicking a result jumps to it.
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                _, index = search.hit_index.hit(event.pos)
+                if index is not None and index < len(search.results):
+                    self.open_result(search.results[index])
+
+        #For the stats screen.
+        elif self.current_state == "stats":
+            self.stats_back_button.get_clicked()
+            if self.stats_back_button.clicked or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                self.current_state = "menu"
+                reset_buttons(self.buttons)
+
+        #For the today screen.
+        elif self.current_state == "today":
+
+            #Back button check. 
+            self.today_back_button.get_clicked()
+            if self.today_back_button.clicked:
+                self.calendar.selected_day = None
+                self.current_state = "menu"
+                reset_buttons(self.buttons)
+
+    def edit_tasks_box(self, notes_or_tasks : str, index : int):
+        #Starts typing in a task or note box of the Tasks screen.
+        tasks = self.tasks
+        tasks.show_row(index)
+        box = tasks.box(notes_or_tasks, index)
+        text = (tasks.notes if notes_or_tasks == "notes" else tasks.tasks)[index]
+        self.edit_buffer.open((notes_or_tasks, index), text, lambda text: tasks.set_text(notes_or_tasks, index, text), (box.x + 5, box.y), box.height)
+        self.editing = True
+
+    def edit_day_box(self, task_index : int):
+        #Starts typing in a task box of the Calendar's day window.
+        calendar = self.calendar
+        text = calendar.get_day(calendar.selected_date())[task_index]
+        self.edit_buffer.open(("day", calendar.selected_date().isoformat(), task_index), text,
+                              lambda text: calendar.set_task(task_index, text), (0, 70 + 70*task_index), HEIGHT//6)
+        self.editing = True
+
+    def stop_editing(self):
+        self.edit_buffer.close()
+        self.editing = False
+        undo_history.seal() #Typing in the box again is another step.
+
+    def undo(self, redo=False):
+        #Undoes (or redoes) the last edit, wherever it was made, finishing any typing first.
+        self.stop_editing()
+        records = undo_history.redo() if redo else undo_history.undo()
+        undo_history.paused = True #The edits made undoing arent steps themselves.
+        try:
+            for record in records:
+                self.apply_edit(record)
+        finally:
+            undo_history.paused = False
+
+    def apply_edit(self, record : tuple):
+        #Makes an edit given as a journal record, through the screen it belongs to so it is redrawn and saved.
+        if record[0] == "text":
+            self.tasks.set_text(record[1], record[2], record[3])
+            if self.current_state == "tasks":
+                self.tasks.show_row(record[2])
+        elif record[0] == "cell":
+            self.calendar.set_cell(datetime.date.fromisoformat(record[1]), record[2], record[3])
+        elif record[0] == "tick" and record[1] in SUBJECT_INDEX: #Subjects removed from the config cant be ticked.
+            self.checklist.set_ticks(SUBJECT_INDEX[record[1]], record[2])
+        elif record[0] == "rules":
+            self.calendar.set_rules(record[1])
+
+    def open_search(self):
+        #Shows the Search screen, indexing everything the first time it is opened.
+        if not search_index.built:
+            days = storage.load_days() #Months the Calendar hasnt fetched yet are searched too.
+            days.update(self.planner.store.days)
+            search_index.build(self.planner, days)
+        self.search.set_query(self.search.query) #Anything edited since the last search is found.
+        self.current_state = "search"
+
+    def open_result(self, key : tuple):
+        #Jumps to the box of a search result: its day window in the Calendar, or the Tasks screen.
+        if key[0] == "day":
+            self.calendar.open_day(datetime.date.fromisoformat(key[1]), key[2])
+            self.current_state = "calendar"
+        else:
+            self.current_state = "tasks"
+            self.tasks.show_row(key[1])
+        reset_buttons(self.buttons)
+
+    def remind(self, kind : str, text : str, date : datetime.date):
+        '''
+        Shows a reminder that is due.
+
+        Parameters:
+        kind (str): "activity" for an activity of the timetable about to start, or "entries" for the Calendar entries of a day.
+        text (str): The activity and its time (for "activity").
+        date (datetime.date): The day the reminder is for.
+        '''
+        if kind == "activity":
+            self.menu.check_transition()
+            self.show_reminder(f"NEXT: {text}")
+        elif kind == "entries":
+            entries = [entry for entry, _ in self.calendar.get_entries(date) if entry]
+            if entries:
+                self.show_reminder("TODAY: " + ", ".join(entries))
+
+    def show_reminder(self, text : str):
+        self.reminder = text
+        self.reminder_until = input_source.now() + datetime.timedelta(seconds=REMINDER_SHOWN)
+        renderer.mark_dirty(REMINDER_RECT)
+
+    def hide_reminder(self):
+        self.reminder = None
+        self.reminder_until = None
+        renderer.mark_all() #Whatever screen is under the reminder is drawn again.
+
+    def ms_until_reminder(self):
+        #Returns the ms until the next reminder is due or the one shown is hidden, used as a timer for idle waiting.
+        now = input_source.now()
+        due = [ms for ms in (self.reminders.ms_until_due(now),) if ms is not None]
+        if self.reminder_until is not None:
+            due.append(int((self.reminder_until - now).total_seconds()*1000) + 1)
+        return min(due, default=None)
+
+    def reload_config(self):
+        #Uses CONFIG_FILE once it has been edited, only rebuilding what the edited settings affect.
+        global FONT
+        new_config = config_watcher.poll()
+        if new_config is None:
+            return
+        changes = apply_config(new_config, [self.planner])
+        if changes & {"day_types", "schedule"}:
+            self.menu.refresh()
+            self.menu.invalidate()
+            now = input_source.now()
+            self.reminders.clear()
+            self.reminders.plan_day(now.date(), now)
+        if "subjects" in changes:
+            self.checklist.layout()
+            self.checklist.tick_marks = self.planner.tick_marks
+            self.checklist.history = self.planner.history
+            self.stats.refresh(self.planner.history)
+            renderer.mark_all()
+        if "font" in changes:
+            FONT = new_config.font
+            if self._calendar is not None:
+                self._calendar.grid_surfaces.clear() #Rendered in the old font.
+            if self._tasks is not None:
+                self._tasks.row_surfaces.clear()
+            renderer.mark_all()
+
+    @timed("save")
+    def autosave(self):
+        #Autosaves (folding the journal into data.pickle) once edits have settled down or the journal is large enough.
+        storage.poll(self.get_data())
+
+    def update(self):
+        #Per frame work after the events are handled, which works out what needs redrawing.
+        self.edit_buffer.flush() #Everything typed this frame is one edit.
+        self.menu.check_transition()
+
+        if self.loader is not None and not self.loader.is_alive():
+            self.wait_loaded() #The worker thread has finished, so this doesnt block.
+        if self.planner is not None:
+            self.autosave()
+            if config_watcher is not None:
+                self.reload_config()
+            #Due reminders are posted, to be handled with the next frame's events.
+            now = input_source.now()
+            for kind, text, date in self.reminders.due(now):
+                pygame.event.post(pygame.event.Event(REMINDER_EVENT, kind=kind, text=text, date=date))
+            if self.reminder is not None and now >= self.reminder_until:
+                self.hide_reminder()
+        if profiler.enabled:
+            renderer.mark_dirty(profiler.rect) #The overlay's numbers change every frame.
+
+        #Anything that changes which screen is shown invalidates the whole screen.
+        view = (self.current_state,)
+        if self.current_state in ("calendar", "today"):
+            calendar = self.calendar
+            view += (calendar.day_window, calendar.current_year, calendar.current_month, calendar.selected_day)
+        if view != self.last_view:
+            renderer.mark_all()
+            self.last_view = view
+        if self.editing != self.last_editing:
+            renderer.mark_dirty(pygame.Rect(0, 0, 10, 10))
+            self.last_editing = self.editing
+
+    def draw(self):
+        #Draws the screen being shown.
+        screen.fill(BACKGROUND_COLOR) #Background of the screen.
 
         #Draws a specific back button based on current state (to know which state to switch to if needed).
-        if current_state == "today":
-            today(calendar)
-            today_back_button.draw()
+        if self.current_state == "today":
+            today(self.calendar)
+            self.today_back_button.draw()
                         
-        if current_state == "calendar":
-            calendar.draw()
-            if calendar.day_window:
-                day_window_back_button.draw()
+        if self.current_state == "calendar":
+            self.calendar.draw()
+            if self.calendar.day_window:
+                self.day_window_back_button.draw()
 
             else:
-                calendar_back_button.draw()
+                self.calendar_back_button.draw()
 
-        if current_state == "menu":
-            for obj in objects.values():
+        if self.current_state == "menu":
+            for obj in self.objects.values():
                 obj.draw()
-            for button in menu_buttons:
+            for button in self.menu_buttons:
                 button.draw()
 
-        elif current_state == "tasks":
-            tasks.draw()
-            tasks_back_button.draw()
+        elif self.current_state == "tasks":
+            self.tasks.draw()
+            self.tasks_back_button.draw()
+
+        elif self.current_state == "search":
+            self.search.draw()
+            self.search_back_button.draw()
+
+        elif self.current_state == "stats":
+            self.stats.draw()
+            self.stats_back_button.draw()
+
+        if profiler.enabled:
+            profiler.draw(screen)
+
+        if self.reminder is not None:
+            pygame.draw.rect(screen, REMINDER_COLOR, REMINDER_RECT)
+            draw_highlighted_rect(screen, REMINDER_RECT, (0, 0, 0), (0, 0, 0), 3, 3)
+            draw_text(screen, FONT, self.reminder, (REMINDER_RECT.x + 10, REMINDER_RECT.y + 2), 35, (0, 0, 0))
 
         #A red dot shown at the top left corner of the screen to signify that the user is editing text.
-        if editing:
+        if self.editing:
             draw_highlighted_rect(screen, pygame.Rect(0, 0, 10, 10), (255, 0, 0), (255, 0, 0), 10, 10)
-        pygame.display.flip() # Updates display.
+            self.edit_buffer.draw()
 
+def main(screen, idle=IDLE_MODE, backend=STORAGE, record=None, profile_frames=None, profile_file=PROFILE_FILE, startup_profile=False):
+    '''
+    This Function corroborates all classes, methods and other functions into one main pygame loop.
+
+    Parameter:
+    screen (pygame.Surface): The main screen everything will be blit on.
+    idle (bool): If True, the loop sleeps while nothing is happening instead of running at FPS.
+    backend (str): Where data is kept (see STORAGE).
+    record (str): If given, the file the session's input is recorded to (see Input_recorder).
+    profile_frames (int): If given, the amount of frames a cProfile capture is taken of.
+    profile_file (str): Where the cProfile capture is written (it can be read with pstats).
+    startup_profile (bool): If True, how long each step of starting up took is printed.
+    '''
+    startup = Startup_profile() if startup_profile else None
+    if startup is not None:
+        startup.mark("imports and window")
+    global storage, config_watcher, FONT
+    config_watcher = Config_watcher(CONFIG_FILE)
+    apply_config(load_config_or_defaults(CONFIG_FILE))
+    FONT = get_config().font
+    storage = open_storage(backend)
+    pygame.key.set_repeat(KEY_REPEAT_DELAY, KEY_REPEAT_INTERVAL) #Holding a key (eg: backspace or an arrow) repeats it.
+
+    #The Menu is drawn while the data loads.
+    app = App(assets.image(TICK_IMAGE))
+    app.start_loading()
+    if startup is not None:
+        startup.mark("app")
+
+    #Pygame clock to record framerate.
+    clock = pygame.time.Clock()
+    scheduler = Idle_scheduler(idle)
+    scheduler.add_timer(app.menu.ms_until_transition) #The menu changes once the next task starts.
+    scheduler.add_timer(storage.ms_until_due)
+    scheduler.add_timer(config_watcher.ms_until_due) #Edits to the config are picked up while idle too.
+    scheduler.add_timer(app.ms_until_reminder)
+    recorder = Input_recorder(record, input_source) if record else None
+    capture = cProfile.Profile() if profile_frames else None
+    if capture is not None:
+        capture.enable()
+    caption = ""
+    renderer.mark_all()
+    while app.running:
+        events = scheduler.get_events(clock, renderer.is_dirty() or buttons_cooling(app.buttons))
+        profiler.begin_frame()
+        if recorder is not None:
+            recorder.record(scheduler.frames, events)
+        increment_button_ticks(app.buttons) #All button's ticks incremneted at the start of the loop.
+        new_caption = scheduler.caption(clock)
+        if new_caption != caption:
+            caption = new_caption
+            pygame.display.set_caption(caption) #Updates caption based on framerate.
+
+        #Event check
+        for event in events:
+            app.handle_event(event)
+        app.update()
+
+        #Nothing is drawn or presented if nothing has changed since the last frame.
+        if renderer.begin_frame(screen):
+            app.draw()
+            renderer.end_frame(screen) # Updates the dirty parts of the display.
+        profiler.end_frame()
+
+        if startup is not None:
+            if renderer.frames_drawn > 0:
+                startup.mark("first frame")
+            if app.planner is not None:
+                startup.mark("data loaded")
+            if startup.done(4):
+                print(startup.report())
+                startup = None
+
+        if capture is not None and (scheduler.frames >= profile_frames or not app.running):
+            capture.disable()
+            capture.dump_stats(profile_file)
+            capture = None
+
+    if recorder is not None:
+        recorder.close()
     pygame.quit()   
 
+def parse_args(argv=None) -> argparse.Namespace:
+    #Parses the command line options of the app.
+    parser = argparse.ArgumentParser(description="Task Manager for GCSE study.")
+    parser.add_argument("--idle", action="store_true", help="sleep while nothing is happening instead of running at a fixed FPS")
+    parser.add_argument("--storage", choices=["pickle", "sqlite"], default=STORAGE, help="where the planner's data is kept")
+    parser.add_argument("--record", metavar="LOG", help="record the session's input to a log that replay.py can play back")
+    parser.add_argument("--profile", type=int, metavar="FRAMES", help="write a cProfile capture of the first FRAMES frames")
+    parser.add_argument("--profile-output", default=PROFILE_FILE, help="where the --profile capture is written (read it with pstats)")
+    parser.add_argument("--startup-profile", action="store_true", help="print how long each step of starting up took")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    tick_img = pygame.image.load("images\\tick_mark.png").convert_alpha() #Reduces lag.
-    main(screen)
\ No newline at end of file
+    main(screen, idle=IDLE_MODE or args.idle, backend=args.storage, record=args.record, profile_frames=args.profile, profile_file=args.profile_output, startup_profile=args.startup_profile)
\ No newline at end of file
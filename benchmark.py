@@ -0,0 +1,207 @@
+'''
+Headless benchmarks for the Task Manager. Builds the app against an off-screen surface (using SDL's dummy video
+driver, so no window or display is needed) and times each screen's draw() and the main event handlers over
+many iterations. Results are printed (or written) as JSON, so they can be compared between changes.
+
+Usage:
+python benchmark.py [--iterations 2000] [--output results.json]
+'''
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") #Must be set before pygame is initialised.
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") #Keeps the printed results valid JSON.
+
+import argparse
+import itertools
+import json
+import platform
+import time
+import tracemalloc
+
+import pygame
+import Task_Manager as tm
+from model import Storage
+
+class Null_storage(Storage):
+    #Storage that keeps nothing, so benchmarks never touch the saved data.
+    def load(self, default : dict) -> dict:
+        return default
+
+    def write(self, record : tuple):
+        pass
+
+    def save(self, data : dict):
+        pass
+
+    def clear(self):
+        pass
+
+def percentile(samples : list, fraction : float) -> float:
+    #Returns the value at a given fraction (eg: 0.99) of sorted samples.
+    return samples[min(len(samples) - 1, int(len(samples)*fraction))]
+
+def time_calls(func, iterations : int, setup=None) -> dict:
+    '''
+    Times a function over many calls, then calls it again under tracemalloc to measure its memory allocations.
+
+    Parameters:
+    func (function): The function being timed, taking no arguments.
+    iterations (int): Amount of timed calls.
+    setup (function): Called (untimed) before each call, to reset any state func changes.
+
+    Returns:
+    dict : Timings in microseconds and allocations in bytes.
+    '''
+    timings = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter_ns()
+        func()
+        timings.append(time.perf_counter_ns() - start)
+        tm.renderer.dirty_rects.clear() #Nothing is presented, so the dirty regions would only pile up.
+    timings.sort()
+
+    calls = max(1, iterations//10) #tracemalloc slows everything down, so fewer calls are traced.
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    for _ in range(calls):
+        if setup is not None:
+            setup()
+        func()
+        tm.renderer.dirty_rects.clear()
+    end_memory, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "mean_us": sum(timings)/len(timings)/1000,
+        "p50_us": percentile(timings, 0.5)/1000,
+        "p99_us": percentile(timings, 0.99)/1000,
+        "max_us": timings[-1]/1000,
+        "alloc_peak_bytes": peak_memory - start_memory,
+        "alloc_retained_bytes_per_call": (end_memory - start_memory)/calls
+    }
+
+def key_event(key : int, unicode="") -> pygame.event.Event:
+    return pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode, mod=0)
+
+def text_event(text : str) -> pygame.event.Event:
+    return pygame.event.Event(pygame.TEXTINPUT, text=text)
+
+def click_event(pos : tuple, button=1) -> pygame.event.Event:
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=button)
+
+def build_app() -> tm.App:
+    #Builds the app against an off-screen surface, with some example data so there is text to draw.
+    tm.screen = pygame.Surface((tm.WIDTH, tm.HEIGHT))
+    tm.storage = Null_storage()
+    app = tm.App(tm.assets.image(tm.TICK_IMAGE))
+    app.load()
+    for i in range(len(app.tasks.task_boxes)):
+        app.tasks.tasks[i] = f"Task {i}"
+        app.tasks.notes[i] = f"Some notes about task {i}"
+    for i in range(len(tm.SUBJECTS)):
+        app.checklist.tick_marks[tm.SUBJECTS[i]] = i % tm.MAX_TICKS
+    app.calendar.selected_day = app.calendar.day - 1
+    for task_index in range(tm.TASK_SLOTS):
+        app.calendar.store.set(app.calendar.selected_date().isoformat(), task_index, f"Revision {task_index}")
+    return app
+
+def run_benchmarks(iterations : int) -> dict:
+    '''
+    Runs every benchmark.
+
+    Parameter:
+    iterations (int): Amount of timed calls per benchmark.
+
+    Returns:
+    dict : Each benchmark's name with its results, plus the text cache stats and some info on the machine.
+    '''
+    app = build_app()
+    calendar = app.calendar
+    results = {}
+
+    def set_state(state, day_window=False, editing=False):
+        #Returns a setup function that puts the app on a given screen.
+        def setup():
+            app.current_state = state
+            calendar.day_window = day_window
+            calendar.selected_day = calendar.day - 1 if day_window else None
+            calendar.selected_task = 0 if day_window else None
+            app.stop_editing()
+            if editing and day_window:
+                app.edit_day_box(0)
+            elif editing:
+                app.edit_tasks_box("tasks", 0)
+        return setup
+
+    def handle_cycle(events):
+        #Returns a function handling the next of some events each call.
+        cycle = itertools.cycle(events)
+        return lambda: app.handle_event(next(cycle))
+
+    def typing_cycle(events):
+        #Returns a function handling the next of some typing events each call, then setting the box to what was typed (as App.update does each frame).
+        handle = handle_cycle(events)
+        def func():
+            handle()
+            app.edit_buffer.flush()
+        return func
+
+    #Drawing each screen.
+    for name, state, day_window in [("draw_menu", "menu", False), ("draw_tasks", "tasks", False), ("draw_calendar", "calendar", False),
+                                    ("draw_day_window", "calendar", True), ("draw_today", "today", False)]:
+        set_state(state, day_window)()
+        results[name] = time_calls(app.draw, iterations)
+
+    #Drawing the Tasks screen scrolled half way down a long list, which should cost the same as a short one.
+    short_lists = (app.tasks.tasks, app.tasks.notes)
+    app.tasks.set_lists([f"Task {i}" for i in range(10000)], [f"Some notes about task {i}" for i in range(10000)])
+    app.tasks.scroll_to(5000)
+    set_state("tasks")()
+    results["draw_tasks_10000"] = time_calls(app.draw, iterations)
+    app.tasks.scroll = 0
+    app.tasks.set_lists(*short_lists)
+
+    #Drawing primitives.
+    results["draw_text"] = time_calls(lambda: tm.draw_text(tm.screen, tm.FONT, "Benchmark", (0, 0), 40, (0, 0, 0)), iterations)
+    results["draw_highlighted_rect"] = time_calls(lambda: tm.draw_highlighted_rect(tm.screen, pygame.Rect(10, 10, 100, 100), (0, 0, 0), (0, 0, 0), 1, 1), iterations)
+
+    #Event handlers in each screen.
+    row = app.checklist.box_rects[0].center
+    set_state("menu")()
+    results["event_menu_tick"] = time_calls(handle_cycle([click_event(row, 1), click_event(row, 3)]), iterations)
+    results["event_menu_now"] = time_calls(handle_cycle([click_event(app.menu.now_rect.center)]), iterations)
+    set_state("tasks", editing=True)()
+    results["event_tasks_typing"] = time_calls(typing_cycle([text_event("a"), key_event(pygame.K_BACKSPACE)]), iterations)
+    set_state("calendar", day_window=True, editing=True)()
+    results["event_calendar_typing"] = time_calls(typing_cycle([text_event("a"), key_event(pygame.K_BACKSPACE)]), iterations)
+    def reset_day_box():
+        #Puts back the text pasted into the first task box, then starts typing in it again.
+        app.stop_editing()
+        calendar.set_task(0, "Revision 0")
+        app.edit_day_box(0)
+    results["event_calendar_paste"] = time_calls(typing_cycle([text_event("a pasted line of revision notes "*4)]), iterations, setup=reset_day_box)
+    set_state("calendar")()
+    results["event_calendar_month"] = time_calls(handle_cycle([key_event(pygame.K_RIGHT), key_event(pygame.K_LEFT)]), iterations)
+    results["event_calendar_day_click"] = time_calls(handle_cycle([click_event(calendar.get_day_rects()[0].center)]), iterations, setup=set_state("calendar"))
+
+    results["text_cache"] = tm.text_cache.stats()
+    results["machine"] = {"python": platform.python_version(), "pygame": pygame.version.ver, "video_driver": pygame.display.get_driver()}
+    return results
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the Task Manager.")
+    parser.add_argument("--iterations", type=int, default=2000, help="timed calls per benchmark")
+    parser.add_argument("--output", help="file to write the JSON results to (printed if not given)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = json.dumps(run_benchmarks(args.iterations), indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(results)
+    else:
+        print(results)
@@ -0,0 +1,400 @@
+'''
+Exports the planner to iCalendar (.ics) or CSV files and imports them back, without pygame and without unpickling
+anything from the shared file. Exports are written as they are generated (a day at a time, see Storage.iter_days),
+and imports are read a line at a time and written to storage in batches of BATCH_SIZE edits, so neither holds the
+whole file in memory. Imports are added onto the saved data as edits (see Journal), so run them with the app closed.
+
+What is exported:
+- Every Calendar task box with text in it, as an all day event (ics) or a "day" row (csv).
+- The Calendar's recurring entries, as repeating events (ics) or "rule" rows (csv).
+- The Tasks screen's tasks and notes, as to-dos (ics) or "tasks" and "notes" rows (csv).
+- The tick marks and their history, as "tick" and "history" rows (csv only). History older than the newest change
+  already saved is skipped on import.
+- The timetable (see CONFIG_FILE), as weekly repeating events (ics) or "timetable" rows (csv). It isnt part of the
+  saved data, so imports skip it.
+
+CSV rows are type, key, index, text, kind, until:
+day: date, task box index, text
+tasks/notes: (blank), index, text
+rule: start date, interval in days, text, "every" or "countdown", last date (blank for none)
+history: subject, +1 or -1, time (ISO format)
+tick: subject, amount of ticks
+timetable: day type, time (HHMM), activity
+
+Events from other calendar apps can be imported too: each fills the next free task box of its day (going by what is
+already saved, events on a day with no free box left are skipped), and daily or weekly repeats become recurring
+entries (other repeats only keep their first day).
+
+Usage:
+python exchange.py export planner.ics [--storage sqlite]
+python exchange.py import planner.csv [--storage sqlite]
+'''
+import argparse
+import csv
+import datetime
+import re
+
+from model import (MAX_ROWS, MAX_RULE_INTERVAL, MAX_TICKS, TASK_SLOTS, EMPTY_DAY, STORAGE, SUBJECTS, DAYS, SCHEDULE, Rule,
+                   CONFIG_FILE, valid_rules, default_data, empty_history, get_day_type, open_storage, apply_config,
+                   load_config_or_defaults)
+
+BATCH_SIZE = 500 #Amount of imported edits written to storage at once.
+PRODID = "-//GCSE Task Manager//Planner export//EN"
+ICS_LINE_BYTES = 75 #Longest a line of an .ics file can be before it is folded onto the next (RFC 5545).
+CSV_HEADER = ["type", "key", "index", "text", "kind", "until"]
+BYDAY = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"] #iCalendar's names of each day in DAYS.
+ICS_ESCAPED = re.compile(r"\\([\\;,nN])")
+
+def ics_escape(text : str) -> str:
+    #Escapes text for an .ics property value.
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def ics_unescape(text : str) -> str:
+    #Undoes ics_escape.
+    return ICS_ESCAPED.sub(lambda match: "\n" if match.group(1) in "nN" else match.group(1), text)
+
+def ics_date(date : datetime.date) -> str:
+    return date.strftime("%Y%m%d")
+
+def fold(line : str) -> str:
+    #Returns a content line split into lines of at most ICS_LINE_BYTES bytes, each continuing line starting with a space.
+    lines = []
+    current = ""
+    size = 0
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > ICS_LINE_BYTES:
+            lines.append(current)
+            current = " "
+            size = 1
+        current += char
+        size += char_size
+    lines.append(current)
+    return "\r\n".join(lines) + "\r\n"
+
+def event(component : str, uid : str, stamp : str, properties : list):
+    #Generates the content lines of one event (or to-do), given its properties as (name, value) pairs.
+    yield f"BEGIN:{component}"
+    yield f"UID:{uid}"
+    yield f"DTSTAMP:{stamp}"
+    for name, value in properties:
+        yield f"{name}:{value}"
+    yield f"END:{component}"
+
+def ics_lines(data : dict, days, today : datetime.date):
+    '''
+    Generates the content lines (unfolded) of an .ics export.
+
+    Parameters:
+    data (dict): The saved data (see default_data).
+    days (iterator): Every day with content, as (date, task box strings), see Storage.iter_days.
+    today (datetime.date): The timetable's events start on the week of today.
+
+    Yields:
+    str : Each content line.
+    '''
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield "BEGIN:VCALENDAR"
+    yield "VERSION:2.0"
+    yield f"PRODID:{PRODID}"
+    yield "CALSCALE:GREGORIAN"
+
+    for date, day in days:
+        start = datetime.date.fromisoformat(date)
+        for slot, text in enumerate(day):
+            if text:
+                yield from event("VEVENT", f"day-{date}-{slot}", stamp, [
+                    ("DTSTART;VALUE=DATE", ics_date(start)), ("DTEND;VALUE=DATE", ics_date(start + datetime.timedelta(days=1))),
+                    ("SUMMARY", ics_escape(text)), ("X-PLANNER-TYPE", "day"), ("X-PLANNER-SLOT", slot)])
+
+    for index, rule in enumerate(valid_rules(data.get("rules", ()))):
+        if rule.interval % 7 == 0:
+            repeat = f"FREQ=WEEKLY;INTERVAL={rule.interval//7}"
+        else:
+            repeat = f"FREQ=DAILY;INTERVAL={rule.interval}"
+        if rule.until is not None:
+            repeat += f";UNTIL={ics_date(rule.until)}"
+        yield from event("VEVENT", f"rule-{index}-{rule.start.isoformat()}", stamp, [
+            ("DTSTART;VALUE=DATE", ics_date(rule.start)), ("RRULE", repeat), ("SUMMARY", ics_escape(rule.text)),
+            ("X-PLANNER-TYPE", "rule"), ("X-PLANNER-RULE", rule.kind)])
+
+    monday = today - datetime.timedelta(days=today.weekday())
+    for day_type, (minutes, labels, activities) in SCHEDULE.items():
+        week = [monday + datetime.timedelta(days=i) for i in range(len(DAYS))]
+        week = [date for date in week if get_day_type(date) == day_type]
+        if not week:
+            continue
+        byday = ",".join(BYDAY[date.weekday()] for date in week)
+        for i, (start, label, activity) in enumerate(zip(minutes, labels, activities)):
+            end = minutes[i + 1] if i + 1 < len(minutes) else 24*60 #The last activity lasts until midnight.
+            yield from event("VEVENT", f"timetable-{day_type}-{label}", stamp, [
+                ("DTSTART", f"{ics_date(week[0])}T{label}00"), ("DURATION", f"PT{end - start}M"), ("RRULE", f"FREQ=WEEKLY;BYDAY={byday}"),
+                ("SUMMARY", ics_escape(activity)), ("CATEGORIES", ics_escape(day_type)), ("X-PLANNER-TYPE", "timetable")])
+
+    for index, (task, note) in enumerate(zip(data["tasks"], data["notes"])):
+        if task or note:
+            yield from event("VTODO", f"task-{index}", stamp, [
+                ("SUMMARY", ics_escape(task)), ("DESCRIPTION", ics_escape(note)), ("X-PLANNER-INDEX", index)])
+
+    yield "END:VCALENDAR"
+
+def csv_rows(data : dict, days):
+    '''
+    Generates the rows of a CSV export (see the top of this file).
+
+    Parameters:
+    data (dict): The saved data (see default_data).
+    days (iterator): Every day with content, as (date, task box strings), see Storage.iter_days.
+
+    Yields:
+    list : Each row, the header first.
+    '''
+    yield CSV_HEADER
+    for date, day in days:
+        for slot, text in enumerate(day):
+            if text:
+                yield ["day", date, slot, text, "", ""]
+    for kind, text, start, interval, until in data.get("rules", ()):
+        yield ["rule", start, interval, text, kind, until or ""]
+    for notes_or_tasks in ("tasks", "notes"):
+        for index, text in enumerate(data[notes_or_tasks]):
+            if text:
+                yield [notes_or_tasks, "", index, text, "", ""]
+    history = data.get("history", empty_history())
+    for when, subject, delta in zip(history["times"], history["subjects"], history["deltas"]):
+        yield ["history", history["names"][subject], delta, datetime.datetime.fromtimestamp(when).isoformat(), "", ""]
+    for subject, count in dict(data["tick_marks"]).items():
+        yield ["tick", subject, count, "", "", ""]
+    for day_type, (_, labels, activities) in SCHEDULE.items():
+        for label, activity in zip(labels, activities):
+            yield ["timetable", day_type, label, activity, "", ""]
+
+def unfold(lines):
+    #Generates the content lines of an .ics file, joining folded lines back together.
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+def parse_line(line : str) -> tuple:
+    #Splits a content line into its name (upper case), parameters (dict) and value.
+    name, _, value = line.partition(":")
+    name, *parameters = name.split(";")
+    return name.upper(), dict(parameter.partition("=")[::2] for parameter in parameters), value
+
+def parse_ics_date(value : str) -> datetime.date:
+    #Returns the date of a DATE or DATE-TIME value (any time or time zone is left out).
+    return datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+def event_records(properties : dict, free_slots : dict, saved_day):
+    '''
+    Generates the edits importing an event (VEVENT) makes.
+
+    Parameters:
+    properties (dict): The event's properties, each name with its value.
+    free_slots (dict): The task boxes still free in each date imported into so far, which this updates.
+    saved_day (function): Takes a date, returns the task box strings already saved in it.
+
+    Yields:
+    tuple : Each edit, as a journal record, or None if the event's day has no free task box left.
+    '''
+    kind = properties.get("X-PLANNER-TYPE", "")
+    if kind == "timetable" or "DTSTART" not in properties or "SUMMARY" not in properties:
+        return
+    date = parse_ics_date(properties["DTSTART"])
+    text = ics_unescape(properties["SUMMARY"])
+
+    if "RRULE" in properties:
+        repeat = dict(part.partition("=")[::2] for part in properties["RRULE"].upper().split(";"))
+        until = parse_ics_date(repeat["UNTIL"]) if "UNTIL" in repeat else None
+        days = {"DAILY": 1, "WEEKLY": 7}.get(repeat.get("FREQ"))
+        if properties.get("X-PLANNER-RULE") == "countdown" and until is not None:
+            yield ("rule", Rule("countdown", text, date, 1, until).to_tuple())
+            return
+        if days is not None and "BYDAY" not in repeat:
+            yield ("rule", Rule("every", text, date, days*int(repeat.get("INTERVAL", 1)), until).to_tuple()) #Raises ValueError for an interval outside 1 to MAX_RULE_INTERVAL days.
+            return
+
+    if date not in free_slots:
+        free_slots[date] = [slot for slot, saved in enumerate(saved_day(date)) if not saved]
+    free = free_slots[date]
+    if "X-PLANNER-SLOT" in properties: #Exported by the planner, so it goes back in the same box.
+        slot = int(properties["X-PLANNER-SLOT"])
+        if slot in free:
+            free.remove(slot)
+    elif free:
+        slot = free.pop(0)
+    else:
+        yield None #The day is full, so the event is skipped rather than written over something.
+        return
+    if 0 <= slot < TASK_SLOTS:
+        yield ("cell", date.isoformat(), slot, text)
+
+def read_ics(lines, saved_day=lambda date: EMPTY_DAY):
+    '''
+    Generates the edits importing an .ics file makes, an event at a time.
+
+    Parameters:
+    lines (iterator): The lines of the file.
+    saved_day (function): Takes a date, returns the task box strings already saved in it (events fill the boxes left free).
+
+    Yields:
+    tuple : Each edit, as a journal record, or None for an event or to-do that couldnt be read (eg: a bad date).
+    '''
+    component = None
+    properties = {}
+    free_slots = {}
+    next_task = 0
+    for line in unfold(lines):
+        name, _, value = parse_line(line)
+        if name == "BEGIN" and value.upper() in ("VEVENT", "VTODO"):
+            component = value.upper()
+            properties = {}
+        elif name == "END" and value.upper() == component:
+            try:
+                if component == "VEVENT":
+                    records = list(event_records(properties, free_slots, saved_day)) #Read in full, so a bad event makes no edits.
+                else:
+                    index = int(properties.get("X-PLANNER-INDEX", next_task))
+                    next_task = index + 1
+                    records = []
+                    if 0 <= index < MAX_ROWS:
+                        records = [("text", "tasks", index, ics_unescape(properties.get("SUMMARY", ""))),
+                                   ("text", "notes", index, ics_unescape(properties.get("DESCRIPTION", "")))]
+            except ValueError:
+                records = [None]
+            yield from records
+            component = None
+        elif component is not None:
+            properties[name] = value
+
+def read_csv(lines):
+    '''
+    Generates the edits importing a CSV file makes, a row at a time. Rows that dont fit the planner (eg: a task box
+    index past the last of a day) are skipped, as are rows that cant be read (eg: an index that isnt a number).
+
+    Parameter:
+    lines (iterator): The lines of the file.
+
+    Yields:
+    tuple : Each edit, as a journal record, or None for a row that couldnt be read.
+    '''
+    rows = csv.reader(lines)
+    if next(rows, None) != CSV_HEADER:
+        raise ValueError("not a planner CSV export (the first row should be its header)")
+    for row in rows:
+        try:
+            record = csv_record(row)
+        except ValueError:
+            yield None
+            continue
+        if record is not None:
+            yield record
+
+def csv_record(row : list):
+    #Returns the edit a row of a CSV file makes, None if it doesnt fit the planner (raises ValueError if the row cant be read).
+    kind, key, index, text, rule_kind, until = (row + [""]*len(CSV_HEADER))[:len(CSV_HEADER)]
+    if kind == "day" and 0 <= int(index) < TASK_SLOTS:
+        return ("cell", datetime.date.fromisoformat(key).isoformat(), int(index), text)
+    elif kind in ("tasks", "notes") and 0 <= int(index) < MAX_ROWS:
+        return ("text", kind, int(index), text)
+    elif kind == "rule" and rule_kind in ("every", "countdown") and 1 <= int(index) <= MAX_RULE_INTERVAL and (until or rule_kind == "every"):
+        return ("rule", Rule.from_tuple((rule_kind, text, key, int(index), until or None)).to_tuple())
+    elif kind == "history" and key in SUBJECTS:
+        return ("history", key, datetime.datetime.fromisoformat(text).timestamp(), int(index))
+    elif kind == "tick" and key in SUBJECTS:
+        return ("tick", key, max(0, min(MAX_TICKS, int(index))))
+
+def export_file(path : str, storage) -> int:
+    '''
+    Exports the saved data to an .ics or .csv file (based on its extension).
+
+    Parameters:
+    path (str): The file to write.
+    storage (Storage): Where the data is saved.
+
+    Returns:
+    int : Amount of lines or rows written.
+    '''
+    data = storage.read(default_data())
+    days = storage.iter_days(data)
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".ics"):
+            for line in ics_lines(data, days, datetime.date.today()):
+                f.write(fold(line))
+                written += 1
+        else:
+            writer = csv.writer(f)
+            for row in csv_rows(data, days):
+                writer.writerow(row)
+                written += 1
+    return written
+
+def import_file(path : str, storage, batch_size=BATCH_SIZE) -> dict:
+    '''
+    Imports an .ics or .csv file (based on its extension) into the saved data.
+
+    Parameters:
+    path (str): The file to read.
+    storage (Storage): Where the data is saved.
+    batch_size (int): Amount of edits written to storage at once.
+
+    Returns:
+    dict : Amount of edits of each type (see Journal) made, with the amount of rows (or events) that couldnt be read
+           (or had no free task box) as "skipped".
+    '''
+    data = storage.read(default_data())
+    months = {}
+    def saved_day(date):
+        #The days of each month imported into are fetched the first time (backends like sqlite dont load them up front).
+        if (date.year, date.month) not in months:
+            months[(date.year, date.month)] = storage.load_month(date.year, date.month)
+        key = date.isoformat()
+        return data["days"].get(key) or months[(date.year, date.month)].get(key, EMPTY_DAY)
+
+    counts = {}
+    batch = []
+    with open(path, newline="", encoding="utf-8") as f:
+        records = read_ics(f, saved_day) if path.lower().endswith(".ics") else read_csv(f)
+        for record in records:
+            if record is None:
+                counts["skipped"] = counts.get("skipped", 0) + 1
+                continue
+            batch.append(record)
+            counts[record[0]] = counts.get(record[0], 0) + 1
+            if len(batch) >= batch_size:
+                storage.write_many(batch)
+                batch = []
+    if batch:
+        storage.write_many(batch)
+    return counts
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Exports the planner to iCalendar or CSV, or imports it back.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="the .ics or .csv file")
+    parser.add_argument("--storage", choices=("pickle", "sqlite"), default=STORAGE, help="where the planner's data is kept")
+    args = parser.parse_args(argv)
+    if not args.path.lower().endswith((".ics", ".csv")):
+        parser.error("the file should end in .ics or .csv")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    apply_config(load_config_or_defaults(CONFIG_FILE)) #The subjects and timetable exported.
+    storage = open_storage(args.storage)
+    if args.command == "export":
+        print(f"Wrote {export_file(args.path, storage)} lines to {args.path}")
+    else:
+        counts = import_file(args.path, storage)
+        skipped = counts.pop("skipped", 0)
+        print(f"Imported {sum(counts.values())} edits from {args.path}: " + ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items()))
+              + (f" ({skipped} skipped, as they couldnt be read or their day was full)" if skipped else ""))
@@ -0,0 +1,1521 @@
+'''
+The planner's data and how it is saved, kept apart from the pygame screens in Task_Manager.py. Nothing here needs
+pygame, so headless tools (eg: exports or tests) can load and edit saved data without initialising it.
+'''
+import array
+import bisect
+import collections
+import datetime
+import heapq
+import json
+import os
+import pickle
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+MONTHS = ['January','February','March','April','May','June','July','August','September','October','November','December']
+MAX_TICKS = 8
+MAX_TASKS = 10 #Amount of task (and note) strings a new planner starts with, more are added as the last ones are written in.
+MAX_ROWS = 100000 #Most task (and note) strings kept, so a bad record or import cant make the lists huge.
+TASK_SLOTS = 6 #Amount of task boxes in each day of the Calendar.
+EMPTY_DAY = ("",)*TASK_SLOTS #Task boxes of a day with nothing written in it.
+JOURNAL_FILE = "data.journal" #Edits made since data.pickle was last written are appended here.
+COMPACT_RECORDS = 1000 #Amount of journal records after which the journal is folded into data.pickle.
+AUTOSAVE_DELAY = 2.0 #Seconds without any edits before data.pickle is autosaved (in the background).
+STORAGE = "pickle" #Where data is kept, "pickle" (data.pickle + journal) or "sqlite" (DATABASE_FILE), also set with --storage.
+DATABASE_FILE = "data.db"
+CONFIG_FILE = "config.json" #The font, subjects and timetable (see load_config), the defaults below are used if it doesnt exist (or has a mistake).
+CONFIG_POLL_INTERVAL = 1.0 #Seconds between checks of whether CONFIG_FILE has been edited.
+MAX_SUBJECTS = 20 #Most subjects that fit (legibly) down the Menu's checklist.
+REMINDER_LEAD = 5 #Minutes before each activity of the timetable that it is reminded of.
+UNDO_STEPS = 500 #Most edits that can be undone.
+UNDO_BUDGET = 1000000 #Rough amount of characters the undo history can hold, the oldest steps are forgotten past it.
+UNDO_COALESCE = 1.0 #Seconds between edits to the same box for them to be undone as one step (eg: a burst of typing).
+FONT_FILE = os.path.join("fonts", "pixel_font-1.ttf") #Custom pixel Font in Fonts directory.
+TIME_OF_DAY = re.compile(r"^([01]\d|2[0-3]):?([0-5]\d)$") #Times in the config's timetable, as "HH:MM" (or "HHMM").
+#The subjects, day types and SCHEDULE in use are changed in place by apply_config, so modules importing them see the config.
+SUBJECTS = ["Physics", "Maths", "Eng Lit", "Eng Lang", "Geography", "Biology", "Chemistry", "Spanish", "FMaths", "Computing"]
+SUBJECT_INDEX = {subject: i for i, subject in enumerate(SUBJECTS)} #Position of each subject in SUBJECTS.
+SUBJECTS_DEFAULT = tuple(SUBJECTS)
+WORD = re.compile(r"\w+") #What counts as a word in the search index.
+RULE_INTERVALS = {"daily": 1, "weekly": 7, "fortnightly": 14} #Recurrence names understood by parse_rule, with their interval in days.
+MAX_RULE_INTERVAL = 5*366 #Most days between occurrences of a recurring entry.
+RULE_SPEC = re.compile(r"^(?:(daily|weekly|fortnightly)|every (\d+) (day|week)s?|(countdown))(?: until (\d{4}-\d{2}-\d{2}))?$")
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEEKDAYS = ["Monday", "Tuesday", "Thursday", "Friday"]
+INTERVENTIONS = ["Wednesday"]
+WEEKENDS = ["Saturday", "Sunday"]
+
+'''
+Default timetable below, notation:
+(t-24hrtime-Activity--)n 
+n = number of tasks in day
+t = time identifier
+--, - =  regular spaces to differentiate tasks
+'''
+TIMETABLE = {
+    "Weekend": "t-0900-Get up, have breakfast.--t-1100-Study time.--t-1500-Start playing.--t-1600-Study again.--t-1800-Code.--t-2000-Study again.--t-2100-Have dinner.--t-2300-Sleep.",
+    "Weekday": "t-0630-Wake up for school.--t-1500-lunch/games.--t-1600-Start to code/HW.--t-1800-Start study.--t-2100-Have dinner.--t-2300-Sleep.",
+    "Intervention": "t-0630-Wake up for school.--t-1630-lunch/games.--t-1730-Start to code/HW.--t-1830-Start study.--t-2100-Have dinner.--t-2300-Sleep."
+}
+
+def compile_timetable(timetable : dict) -> dict:
+    '''
+    Parses the packed timetable strings once, so looking up the current task doesnt have to re-split and re-parse them.
+
+    Parameters:
+    timetable (dict): Each day type and its timetable using the notation above.
+
+    Returns:
+    dict : Each day type as key, with a tuple of 3 lists sorted by time as value:
+           (minutes since midnight (int), 24hr time (str), activity (str)).
+    '''
+    compiled = {}
+    for day_type, tasks in timetable.items():
+        entries = sorted((int(task[2:4])*60 + int(task[4:6]), task[2:6], task[7:]) for task in tasks.split("--"))
+        compiled[day_type] = tuple(list(column) for column in zip(*entries))
+    return compiled
+
+DAY_TYPES = ["Intervention" if day in INTERVENTIONS else "Weekend" if day in WEEKENDS else "Weekday" for day in DAYS] #The day type of each day in DAYS.
+SCHEDULE = compile_timetable(TIMETABLE) #Precompiled TIMETABLE.
+
+def get_day_type(date : datetime.date) -> str:
+    #Returns which timetable (day type) a date follows.
+    return DAY_TYPES[date.weekday()]
+
+class Config:
+    '''
+    A config file's settings, checked and with its timetable already compiled (see load_config).
+
+    Attributes:
+    font (str): File path of the font everything is drawn in.
+    subjects (list): The subjects in the Menu's checklist.
+    day_types (list): The day type (which timetable is followed) of each day in DAYS.
+    schedule (dict): The compiled timetable of each day type (see compile_timetable).
+    '''
+    __slots__ = ("font", "subjects", "day_types", "schedule")
+
+    def __init__(self, font : str, subjects : list, day_types : list, schedule : dict):
+        self.font = font
+        self.subjects = subjects
+        self.day_types = day_types
+        self.schedule = schedule
+
+    def changes(self, other) -> set:
+        #Returns the names of the attributes that differ from another Config.
+        return {name for name in self.__slots__ if getattr(self, name) != getattr(other, name)}
+
+def parse_config(settings : dict) -> Config:
+    '''
+    Checks the settings read from a config file and compiles its timetable. Any setting left out keeps its default.
+
+    Parameter:
+    settings (dict): The config, as {"font": path, "subjects": [names], "days": {day type: [day names]},
+                     "timetable": {day type: {"HH:MM": activity}}}.
+
+    Returns:
+    Config : The settings.
+
+    Raises:
+    ValueError : If anything is wrong with the settings, saying what.
+    '''
+    font = settings.get("font", FONT_FILE)
+    if "font" in settings and (not isinstance(font, str) or not os.path.isfile(font)):
+        raise ValueError(f"font {font!r} is not a font file")
+
+    subjects = settings.get("subjects", list(SUBJECTS_DEFAULT))
+    if not isinstance(subjects, list) or not 0 < len(subjects) <= MAX_SUBJECTS:
+        raise ValueError(f"subjects should be a list of 1 to {MAX_SUBJECTS} names")
+    if not all(isinstance(subject, str) and subject for subject in subjects) or len(set(subjects)) != len(subjects):
+        raise ValueError("subjects should all be different, non-empty names")
+
+    days = settings.get("days", {"Weekday": WEEKDAYS, "Intervention": INTERVENTIONS, "Weekend": WEEKENDS})
+    if not isinstance(days, dict):
+        raise ValueError("days should map each day type to a list of days")
+    day_types = [None]*len(DAYS)
+    for day_type, names in days.items():
+        for name in names if isinstance(names, list) else [names]:
+            if name not in DAYS:
+                raise ValueError(f"{name!r} (in days) is not a day of the week")
+            if day_types[DAYS.index(name)] is not None:
+                raise ValueError(f"{name} is in more than one day type")
+            day_types[DAYS.index(name)] = day_type
+    if None in day_types:
+        raise ValueError(f"{DAYS[day_types.index(None)]} isnt in any day type")
+
+    if "timetable" not in settings:
+        schedule = compile_timetable(TIMETABLE)
+    else:
+        schedule = {}
+        if not isinstance(settings["timetable"], dict) or not all(isinstance(activities, dict) for activities in settings["timetable"].values()):
+            raise ValueError("timetable should map each day type to {\"HH:MM\": activity}")
+        for day_type, activities in settings["timetable"].items():
+            entries = []
+            for time_of_day, activity in activities.items():
+                match = TIME_OF_DAY.match(time_of_day)
+                if match is None or not isinstance(activity, str):
+                    raise ValueError(f"{time_of_day!r}: {activity!r} (in the {day_type} timetable) should be \"HH:MM\": \"activity\"")
+                hours, minutes = match.groups()
+                entries.append((int(hours)*60 + int(minutes), hours + minutes, activity))
+            if not entries:
+                raise ValueError(f"the {day_type} timetable is empty")
+            schedule[day_type] = tuple(list(column) for column in zip(*sorted(entries)))
+    missing = set(day_types) - set(schedule)
+    if missing:
+        raise ValueError(f"there is no timetable for {', '.join(sorted(missing))} days")
+
+    return Config(font, list(subjects), day_types, schedule)
+
+def load_config(path : str) -> Config:
+    #Reads and checks a config file (see parse_config), or returns the defaults if it doesnt exist. Raises ValueError for a bad config.
+    if not os.path.exists(path):
+        return parse_config({})
+    with open(path, encoding="utf-8") as f:
+        try:
+            settings = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path} isnt valid JSON ({e})")
+    if not isinstance(settings, dict):
+        raise ValueError(f"{path} should hold a JSON object")
+    try:
+        return parse_config(settings)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}")
+
+def load_config_or_defaults(path : str) -> Config:
+    #Reads the config to start with, or returns the defaults (printing what is wrong) if it cant be used, so a mistake in it doesnt stop the app or tools starting.
+    try:
+        return load_config(path)
+    except (OSError, ValueError) as e:
+        print(f"Config not used, the defaults are used instead: {e}")
+        return parse_config({})
+
+class Calendar_store:
+    '''
+    Sparse store of the Calendar's task boxes across any amount of years. Only days with something written in
+    them are kept, so memory and save size grow with the actual entries. A day's task boxes are only allocated
+    the first time one of them is written to, and removed again once they are all emptied. Strings written are
+    interned, so an entry repeated across many days (eg: a weekly lesson) is only held in memory once.
+
+    Attributes:
+    days (dict): Each date with content as "YYYY-MM-DD" key, with a list of its TASK_SLOTS task box strings as value.
+    '''
+    __slots__ = ("days",)
+
+    def __init__(self, days=None):
+        self.days = days if days is not None else {}
+
+    def intern_all(self):
+        #Interns the strings of every day, for days that were loaded rather than written through set.
+        for day in self.days.values():
+            day[:] = [sys.intern(text) for text in day]
+
+    def get_day(self, date : datetime.date):
+        #Returns the task box strings of a day (read only, as days without content all share EMPTY_DAY).
+        return self.days.get(date.isoformat(), EMPTY_DAY)
+
+    def set(self, date : str, task_index : int, text : str):
+        '''
+        Sets the text of a task box.
+
+        Parameters:
+        date (str): The date of the day, as "YYYY-MM-DD".
+        task_index (int): Index of the task box in the day.
+        text (str): The new text of the task box.
+        '''
+        day = self.days.get(date)
+        if day is None:
+            if not text:
+                return
+            day = self.days[date] = list(EMPTY_DAY) #Allocated on first write.
+        day[task_index] = sys.intern(text)
+        if not any(day):
+            del self.days[date]
+
+class Tick_counter:
+    '''
+    The amount of ticks logged for each subject in SUBJECTS, kept in an array of one byte per subject. It is read
+    and written like a dict keyed by subject, so it is saved as one.
+
+    Attribute:
+    counts (array.array): The ticks of each subject, in the same order as SUBJECTS.
+    '''
+    __slots__ = ("counts",)
+
+    def __init__(self, tick_marks=None):
+        '''
+        Parameter:
+        tick_marks (dict): Ticks keyed by subject to start with, subjects no longer in SUBJECTS are left out.
+        '''
+        self.counts = array.array("B", bytes(len(SUBJECTS)))
+        for subject, count in (tick_marks or {}).items():
+            if subject in SUBJECT_INDEX:
+                self.counts[SUBJECT_INDEX[subject]] = count
+
+    def __getitem__(self, subject : str) -> int:
+        return self.counts[SUBJECT_INDEX[subject]]
+
+    def __setitem__(self, subject : str, count : int):
+        self.counts[SUBJECT_INDEX[subject]] = count
+
+    def __iter__(self):
+        return iter(SUBJECTS)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def keys(self) -> list:
+        return list(SUBJECTS)
+
+    def values(self) -> list:
+        return self.counts.tolist()
+
+    def items(self) -> list:
+        return list(zip(SUBJECTS, self.counts))
+
+def empty_history() -> dict:
+    #Returns a tick history with nothing in it, in the format it is saved in (see Tick_history.to_data).
+    return {"names": list(SUBJECTS), "times": array.array("d"), "subjects": array.array("B"), "deltas": array.array("b")}
+
+def append_history(history : dict, when : float, subject : str, delta : int):
+    '''
+    Adds a change to a tick history in the format it is saved in (see Tick_history.to_data).
+
+    Parameters:
+    history (dict): The saved history.
+    when (float): When the change was made, in seconds since the epoch.
+    subject (str): The subject ticked.
+    delta (int): +1 for a tick added, -1 for one taken away.
+    '''
+    if subject not in history["names"]:
+        history["names"].append(subject)
+    history["times"].append(when)
+    history["subjects"].append(history["names"].index(subject))
+    history["deltas"].append(delta)
+
+class Tick_history:
+    '''
+    Every change made to the tick marks, kept as a columnar log (one array per column, about 10 bytes a change),
+    along with totals that are updated as each change is added. Stats for any stretch of days are then read
+    from the totals, without going back over the log.
+
+    The totals are kept per subject, with one more slot at the end (all_slot) for every subject together.
+    A streak is the amount of days in a row on which at least one tick was added.
+
+    Attributes:
+    times (array.array): When each change was made, in seconds since the epoch.
+    subjects (array.array): Index in SUBJECTS of the subject of each change.
+    deltas (array.array): +1 for a tick added, -1 for one taken away.
+    day_totals (dict): The net ticks (array.array of each slot) of each day with changes, keyed by the day's ordinal.
+    week_totals (dict): The net ticks (array.array of each slot) of each week with changes, keyed by the ordinal of its Monday.
+    totals (array.array): The net ticks of each slot over all the history.
+    last_days (array.array): The ordinal of the last day a tick was added, for each slot.
+    streaks (array.array): The streak of each slot up to its last day.
+    best_streaks (array.array): The longest streak of each slot.
+    '''
+    __slots__ = ("times", "subjects", "deltas", "day_totals", "week_totals", "totals", "last_days", "streaks", "best_streaks")
+
+    def __init__(self, saved=None):
+        '''
+        Parameter:
+        saved (dict): The history as saved (see to_data), subjects no longer in SUBJECTS are left out.
+        '''
+        self.times = array.array("d")
+        self.subjects = array.array("B")
+        self.deltas = array.array("b")
+        self.day_totals = {}
+        self.week_totals = {}
+        slots = len(SUBJECTS) + 1
+        self.totals = array.array("l", [0])*slots
+        self.last_days = array.array("l", [0])*slots
+        self.streaks = array.array("l", [0])*slots
+        self.best_streaks = array.array("l", [0])*slots
+        if saved is not None:
+            names = saved["names"]
+            for when, subject, delta in zip(saved["times"], saved["subjects"], saved["deltas"]):
+                if names[subject] in SUBJECT_INDEX:
+                    self.add(when, SUBJECT_INDEX[names[subject]], delta)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def all_slot(self) -> int:
+        #Index of the slot for every subject together.
+        return len(self.totals) - 1
+
+    def to_data(self) -> dict:
+        #Returns the history in the format it is saved in, with the names of the subjects its indexes refer to.
+        return {"names": list(SUBJECTS), "times": self.times, "subjects": self.subjects, "deltas": self.deltas}
+
+    def add(self, when : float, subject : int, delta : int):
+        '''
+        Adds a change to the log and the totals.
+
+        Parameters:
+        when (float): When the change was made, in seconds since the epoch.
+        subject (int): Index in SUBJECTS of the subject ticked.
+        delta (int): +1 for a tick added, -1 for one taken away.
+        '''
+        self.times.append(when)
+        self.subjects.append(subject)
+        self.deltas.append(delta)
+        day = datetime.date.fromtimestamp(when).toordinal()
+        monday = day - (day - 1) % 7 #Ordinal 1 (1 Jan 0001) was a Monday.
+        for totals in (self.day_totals, self.week_totals):
+            key = day if totals is self.day_totals else monday
+            if key not in totals:
+                totals[key] = array.array("l", [0])*len(self.totals)
+            totals[key][subject] += delta
+            totals[key][self.all_slot] += delta
+        for slot in (subject, self.all_slot):
+            self.totals[slot] += delta
+            if delta > 0 and day > self.last_days[slot]: #Changes added out of order dont change the streaks.
+                self.streaks[slot] = self.streaks[slot] + 1 if day == self.last_days[slot] + 1 else 1
+                self.best_streaks[slot] = max(self.best_streaks[slot], self.streaks[slot])
+                self.last_days[slot] = day
+
+    def streak(self, slot : int, today : datetime.date) -> int:
+        #Returns the current streak of a slot, which still counts if nothing has been ticked yet today.
+        return self.streaks[slot] if self.last_days[slot] >= today.toordinal() - 1 else 0
+
+    def week(self, date : datetime.date) -> array.array:
+        #Returns the net ticks of each slot in the week (from Monday) containing date.
+        day = date.toordinal()
+        return self.week_totals.get(day - (day - 1) % 7, array.array("l", [0])*len(self.totals))
+
+    def between(self, first : datetime.date, last : datetime.date) -> array.array:
+        #Returns the net ticks of each slot from first to last (inclusive), from the totals of each day.
+        totals = array.array("l", [0])*len(self.totals)
+        for day in range(first.toordinal(), last.toordinal() + 1):
+            day_totals = self.day_totals.get(day)
+            if day_totals is not None:
+                for slot, count in enumerate(day_totals):
+                    totals[slot] += count
+        return totals
+
+class Rule:
+    '''
+    A recurring Calendar entry, stored once rather than copied into every day it falls on.
+
+    Attributes:
+    kind (str): "every" (repeats every interval days) or "countdown" (shows the days left until an exam each day).
+    text (str): The text of the entry.
+    start (datetime.date): The first day the entry is shown on.
+    interval (int): Days between each occurrence.
+    until (datetime.date): The last day the entry is shown on (for a countdown, the day of the exam), or None for no end.
+    '''
+    __slots__ = ("kind", "text", "start", "interval", "until")
+
+    def __init__(self, kind : str, text : str, start : datetime.date, interval=1, until=None):
+        if not 1 <= interval <= MAX_RULE_INTERVAL:
+            raise ValueError(f"a recurring entry's interval must be 1 to {MAX_RULE_INTERVAL} days, not {interval}")
+        if kind == "countdown" and until is None:
+            raise ValueError("a countdown needs the date it counts down to")
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.interval = interval
+        self.until = until
+
+    @classmethod
+    def from_tuple(cls, saved : tuple):
+        #Returns the Rule saved as a tuple by to_tuple (raises ValueError if it isnt a valid Rule).
+        kind, text, start, interval, until = saved
+        return cls(kind, text, datetime.date.fromisoformat(start), interval, datetime.date.fromisoformat(until) if until else None)
+
+    def to_tuple(self) -> tuple:
+        #Returns the Rule as a tuple of strings and ints, the way it is saved.
+        return (self.kind, self.text, self.start.isoformat(), self.interval, self.until.isoformat() if self.until else None)
+
+    def occurrences(self, first : datetime.date, last : datetime.date):
+        '''
+        Generates each occurrence from first to last (inclusive).
+
+        Parameters:
+        first (datetime.date): The first day to look at.
+        last (datetime.date): The last day to look at.
+
+        Yields:
+        tuple : The date and text of an occurrence.
+        '''
+        if self.until is not None:
+            last = min(last, self.until)
+        day = self.start
+        if first > day:
+            skip = -(-(first - day).days//self.interval)*self.interval #Days to the first occurrence from first onwards.
+            if skip > (datetime.date.max - day).days:
+                return
+            day += datetime.timedelta(days=skip)
+        step = datetime.timedelta(days=self.interval)
+        while day <= last:
+            if self.kind == "countdown":
+                days_left = (self.until - day).days
+                yield day, f"{self.text} today" if days_left == 0 else f"{self.text} in {days_left} day{'s'*(days_left != 1)}"
+            else:
+                yield day, self.text
+            if self.interval > (datetime.date.max - day).days:
+                return #The next occurrence would be past the last date there is.
+            day += step
+
+def parse_rule(text : str, date : datetime.date, today : datetime.date):
+    '''
+    Reads a recurring entry typed into a Calendar task box, written as "text | recurrence". The recurrence is one of
+    daily, weekly, fortnightly or every N days/weeks (starting on date), optionally followed by "until YYYY-MM-DD", or
+    countdown (counting down each day from today until date, eg: to an exam).
+
+    Parameters:
+    text (str): The text of the task box.
+    date (datetime.date): The day the text was typed into.
+    today (datetime.date): The current date.
+
+    Returns:
+    Rule : The recurring entry, or None if the text isnt one (or its until date isnt a real date).
+    '''
+    if "|" not in text:
+        return None
+    entry, spec = (part.strip() for part in text.rsplit("|", 1))
+    match = RULE_SPEC.match(spec.lower())
+    if not entry or match is None:
+        return None
+    name, count, unit, countdown, until = match.groups()
+    try:
+        until = datetime.date.fromisoformat(until) if until else None
+    except ValueError: #Eg: 2025-02-30.
+        return None
+    if countdown:
+        return Rule("countdown", entry, min(today, date), 1, date)
+    interval = RULE_INTERVALS[name] if name else int(count)*(7 if unit == "week" else 1)
+    return Rule("every", entry, date, max(1, min(MAX_RULE_INTERVAL, interval)), until)
+
+def valid_rules(saved) -> list:
+    #Returns the Rules saved as tuples, leaving out any that arent valid (eg: written by a bad import), as they cant be shown.
+    rules = []
+    for rule in saved:
+        try:
+            rules.append(Rule.from_tuple(rule))
+        except (ValueError, TypeError):
+            pass
+    return rules
+
+class Rule_set:
+    '''
+    All the recurring entries, with their occurrences worked out a month at a time (only for the months looked at)
+    and cached until the rules are edited.
+
+    Attributes:
+    rules (list): The Rule objs.
+    months (dict): The occurrences in each month looked at, keyed by (year, month). Each is a dict with each date
+                   ("YYYY-MM-DD") as key and a list of (rule index, text) as value.
+    '''
+    __slots__ = ("rules", "months")
+
+    def __init__(self, saved=()):
+        self.rules = valid_rules(saved)
+        self.months = {}
+
+    def to_list(self) -> list:
+        return [rule.to_tuple() for rule in self.rules]
+
+    def add(self, rule : Rule):
+        self.rules.append(rule)
+        self.months.clear()
+
+    def remove(self, index : int):
+        del self.rules[index]
+        self.months.clear()
+
+    def replace(self, saved : list):
+        #Swaps every rule for saved ones (as tuples, see Rule.to_tuple).
+        self.rules = valid_rules(saved)
+        self.months.clear()
+
+    def month(self, year : int, month : int) -> dict:
+        #Returns the occurrences in a month (see months), expanding the rules the first time the month is looked at.
+        key = (year, month)
+        if key not in self.months:
+            first = datetime.date(year, month, 1)
+            last = datetime.date(year + month//12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+            occurrences = {}
+            for index, rule in enumerate(self.rules):
+                for day, text in rule.occurrences(first, last):
+                    occurrences.setdefault(day.isoformat(), []).append((index, text))
+            self.months[key] = occurrences
+        return self.months[key]
+
+    def on_day(self, date : datetime.date) -> list:
+        #Returns the occurrences on a day as (rule index, text).
+        return self.month(date.year, date.month).get(date.isoformat(), [])
+
+class Planner:
+    '''
+    All the data of the planner, without anything about how it is laid out or drawn. The screens in Task_Manager.py
+    share its lists and stores, so their edits are made straight to it.
+
+    Attributes:
+    tick_marks (Tick_counter): The ticks logged for each subject.
+    tasks (list): The strings of the Tasks screen's task boxes.
+    notes (list): The strings of the Tasks screen's note boxes.
+    store (Calendar_store): The Calendar's task boxes.
+    rules (Rule_set): The Calendar's recurring entries.
+    history (Tick_history): Every change made to tick_marks.
+    '''
+    __slots__ = ("tick_marks", "tasks", "notes", "store", "rules", "history")
+
+    def __init__(self, data : dict):
+        '''
+        Parameter:
+        data (dict): Data in the same format as is saved in data.pickle (see default_data).
+        '''
+        self.tick_marks = Tick_counter(data["tick_marks"])
+        self.tasks = data["tasks"]
+        self.notes = data["notes"]
+        self.store = Calendar_store(data["days"])
+        self.store.intern_all()
+        self.rules = Rule_set(data.get("rules", ())) #Saves from before recurring entries dont have any.
+        self.history = Tick_history(data.get("history"))
+
+    def to_data(self) -> dict:
+        #Returns the data in the format it is saved in. The dict refers to the Planner's own lists, so changing it changes the Planner.
+        return {"tick_marks": self.tick_marks, "tasks": self.tasks, "notes": self.notes, "days": self.store.days, "rules": self.rules.to_list(),
+                "history": self.history.to_data()}
+
+def apply_config(new_config : Config, planners=()) -> set:
+    '''
+    Makes a config the one in use. SUBJECTS, SUBJECT_INDEX, DAY_TYPES and SCHEDULE are changed in place, so modules
+    that imported them see the new settings. If the subjects changed, the ticks and tick history of the given planners
+    are moved over to the new subjects (ticks of subjects no longer in the config are dropped).
+
+    Parameters:
+    new_config (Config): The settings to use.
+    planners (iterable): Planners holding ticks of the old subjects.
+
+    Returns:
+    set : The names of the settings that changed (see Config).
+    '''
+    global config
+    changes = new_config.changes(config)
+    saved = [(planner, dict(planner.tick_marks.items()), planner.history.to_data()) for planner in planners] #Taken with the old subjects.
+    config = new_config
+    SUBJECTS[:] = new_config.subjects
+    SUBJECT_INDEX.clear()
+    SUBJECT_INDEX.update((subject, i) for i, subject in enumerate(SUBJECTS))
+    DAY_TYPES[:] = new_config.day_types
+    SCHEDULE.clear()
+    SCHEDULE.update(new_config.schedule)
+    if "subjects" in changes:
+        for planner, tick_marks, history in saved:
+            planner.tick_marks = Tick_counter(tick_marks)
+            planner.history = Tick_history(history)
+    return changes
+
+class Config_watcher:
+    '''
+    Watches a config file for edits, so they are used without restarting. Checking only costs a stat of the file
+    (at most every CONFIG_POLL_INTERVAL seconds), and it is only read once its modification time changes.
+
+    Attributes:
+    path (str): File path of the config.
+    mtime (int): The modification time (in ns) of the config when it was last read, None if it didnt exist.
+    last_poll (float): When the file was last checked (time.monotonic).
+    error (str): What was wrong with the last edit, if it couldnt be used (None otherwise).
+    '''
+    def __init__(self, path : str):
+        self.path = path
+        self.mtime = self.get_mtime()
+        self.last_poll = time.monotonic()
+        self.error = None
+
+    def get_mtime(self) -> int:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self) -> Config:
+        '''
+        Called every frame, checks whether the config has been edited (once CONFIG_POLL_INTERVAL has passed).
+
+        Returns:
+        Config : The edited config, None if it hasnt been edited (or the edit has a mistake, see error).
+        '''
+        now = time.monotonic()
+        if now - self.last_poll < CONFIG_POLL_INTERVAL:
+            return None
+        self.last_poll = now
+        mtime = self.get_mtime()
+        if mtime == self.mtime:
+            return None
+        self.mtime = mtime
+        try:
+            new_config = load_config(self.path)
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            print(f"Config not reloaded: {e}")
+            return None
+        self.error = None
+        return new_config
+
+    def ms_until_due(self) -> int:
+        #Returns the ms until the config should next be checked, used as a timer for idle waiting.
+        return int((self.last_poll + CONFIG_POLL_INTERVAL - time.monotonic())*1000) + 1
+
+def get_config() -> Config:
+    #Returns the config in use.
+    return config
+
+config = parse_config({}) #The defaults, until CONFIG_FILE is applied at startup (see load_config_or_defaults).
+
+class Reminder_queue:
+    '''
+    The upcoming reminders, as a heap ordered by when each is due, so checking what is due each frame only looks at the
+    top of the heap however many are pending. A day's reminders are added when the day starts (see plan_day): one for
+    each activity of its timetable, REMINDER_LEAD minutes before it starts, and one for its Calendar entries, when its
+    first activity starts.
+
+    Attributes:
+    heap (list): The reminders as (due (datetime.datetime), order added (int), kind (str), text (str), date (datetime.date)).
+                 The kinds are "activity", "entries" and "day" (which plans the next day once it is due, and isnt reminded of).
+    added (int): Amount of reminders added, so reminders due at the same time stay in the order they were added.
+    '''
+    __slots__ = ("heap", "added")
+
+    def __init__(self):
+        self.heap = []
+        self.added = 0
+
+    def add(self, due : datetime.datetime, kind : str, text : str, date : datetime.date):
+        heapq.heappush(self.heap, (due, self.added, kind, text, date))
+        self.added += 1
+
+    def plan_day(self, date : datetime.date, now : datetime.datetime):
+        '''
+        Adds the reminders of a day that are still to come.
+
+        Parameters:
+        date (datetime.date): The day.
+        now (datetime.datetime): The current time, activities that have started are left out (the day's Calendar
+                                 entries are reminded of straight away if the day has already started).
+        '''
+        midnight = datetime.datetime.combine(date, datetime.time())
+        next_day = midnight + datetime.timedelta(days=1)
+        self.add(next_day, "day", "", date + datetime.timedelta(days=1))
+        if next_day <= now:
+            return #The day is over.
+        times, labels, activities = SCHEDULE[get_day_type(date)]
+        for minutes, label, activity in zip(times, labels, activities):
+            due = midnight + datetime.timedelta(minutes=minutes - REMINDER_LEAD)
+            if due + datetime.timedelta(minutes=REMINDER_LEAD) >= now: #Reminded of (late) until the activity starts.
+                self.add(due, "activity", f"{activity} @{label[:2]}:{label[2:]}", date)
+        first = midnight + datetime.timedelta(minutes=times[0] if times else 0)
+        self.add(max(first, now), "entries", "", date)
+
+    def due(self, now : datetime.datetime):
+        '''
+        Removes the reminders that are due, skipping those of activities that have already started.
+
+        Parameter:
+        now (datetime.datetime): The current time.
+
+        Yields:
+        tuple : Each due reminder as (kind, text, date), in the order they were due.
+        '''
+        while self.heap and self.heap[0][0] <= now:
+            due, _, kind, text, date = heapq.heappop(self.heap)
+            if kind == "day":
+                self.plan_day(date, now)
+            elif kind == "activity" and now - due > datetime.timedelta(minutes=REMINDER_LEAD):
+                continue #The activity has already started (eg: the computer was asleep), so it isnt worth reminding of.
+            else:
+                yield kind, text, date
+
+    def ms_until_due(self, now : datetime.datetime):
+        #Returns the ms until the next reminder is due, or None if there arent any.
+        if not self.heap:
+            return None
+        return int((self.heap[0][0] - now).total_seconds()*1000) + 1
+
+    def clear(self):
+        self.heap.clear()
+
+def record_size(record : tuple) -> int:
+    #Returns roughly how much memory a journal record takes, in characters of text.
+    if record[0] == "rules":
+        return 16 + sum(len(rule[1]) + 32 for rule in record[1])
+    return 16 + sum(len(part) for part in record if isinstance(part, str))
+
+class Undo_history:
+    '''
+    The edits that can be undone (and redone), each kept as the journal record of the edit with the record that reverses it,
+    so an undo step costs the size of its edit rather than a copy of the data. Edits to the same box in quick succession
+    (eg: typing a word, which is flushed every frame) are kept as one step, and the oldest steps are forgotten once there
+    are more than UNDO_STEPS or they hold more than UNDO_BUDGET characters.
+
+    Attributes:
+    undo_steps (deque): The steps that can be undone, oldest first. Each is a list of (record, inverse record) in the order they were made.
+    redo_steps (list): The steps undone, which can be redone, last undone at the end.
+    size (int): Rough amount of characters held by every step (see record_size).
+    last_key (tuple): The box the last edit was made to, None if the next edit cant join the last step.
+    last_time (float): When the last edit was made (as a timestamp).
+    paused (bool): True while undoing or redoing, so the edits made doing so arent kept as new steps.
+    '''
+    def __init__(self):
+        self.undo_steps = collections.deque()
+        self.redo_steps = []
+        self.size = 0
+        self.last_key = None
+        self.last_time = 0.0
+        self.paused = False
+
+    def push(self, record : tuple, inverse : tuple, when : float, join=False):
+        '''
+        Keeps an edit so it can be undone.
+
+        Parameters:
+        record (tuple): The edit, as a journal record (see Journal).
+        inverse (tuple): The journal record that undoes it.
+        when (float): When the edit was made (as a timestamp).
+        join (bool): If True, the edit is undone along with the last step (eg: the box cleared when its text becomes a recurring entry).
+        '''
+        if self.paused:
+            return
+        for step in self.redo_steps:
+            self.size -= sum(record_size(r) + record_size(i) for r, i in step)
+        self.redo_steps.clear()
+
+        key = record[:3] if record[0] in ("cell", "text") else None
+        if self.undo_steps and (join or (key is not None and key == self.last_key and when - self.last_time <= UNDO_COALESCE)):
+            step = self.undo_steps[-1]
+            if not join:
+                #Typing into the same box only keeps the newest text, with the inverse of the first edit.
+                old_record, first_inverse = step[-1]
+                self.size -= record_size(old_record)
+                step[-1] = (record, first_inverse)
+                self.size += record_size(record)
+            else:
+                step.append((record, inverse))
+                self.size += record_size(record) + record_size(inverse)
+        else:
+            self.undo_steps.append([(record, inverse)])
+            self.size += record_size(record) + record_size(inverse)
+        self.last_key = key
+        self.last_time = when
+
+        while len(self.undo_steps) > 1 and (len(self.undo_steps) > UNDO_STEPS or self.size > UNDO_BUDGET):
+            self.size -= sum(record_size(r) + record_size(i) for r, i in self.undo_steps.popleft())
+
+    def seal(self):
+        #Makes the next edit start a new step, even if it is to the same box (eg: once the box is no longer being typed in).
+        self.last_key = None
+
+    def undo(self) -> list:
+        #Moves the last step to the redo steps, returning the records that undo it (in the order to apply them).
+        self.seal()
+        if not self.undo_steps:
+            return []
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        return [inverse for _, inverse in reversed(step)]
+
+    def redo(self) -> list:
+        #Moves the last undone step back, returning the records that redo it (in the order to apply them).
+        self.seal()
+        if not self.redo_steps:
+            return []
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        return [record for record, _ in step]
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.size = 0
+        self.seal()
+
+class Search_index:
+    '''
+    Inverted index over the words in the Calendar's task boxes and the Tasks screen's task and note boxes, updated
+    with each edit (see apply_record), so a search only looks up the boxes containing its words.
+
+    Attributes:
+    postings (dict): Each word, with the set of keys of the boxes containing it as value.
+    words (list): Every word in postings, sorted, to find the words starting with a prefix.
+    texts (dict): The text of each box with something written in it, keyed by ("day", "YYYY-MM-DD", task index),
+                  ("tasks", index) or ("notes", index).
+    built (bool): Whether the index has been built (see build).
+    '''
+    def __init__(self):
+        self.postings = {}
+        self.words = []
+        self.texts = {}
+        self.built = False
+
+    def build(self, planner : Planner, days : dict):
+        '''
+        Indexes all the planner's boxes, starting over.
+
+        Parameters:
+        planner (Planner): The planner's data.
+        days (dict): Every day with content, keyed as in Calendar_store (the planner may not hold every month).
+        '''
+        self.postings = {}
+        self.words = []
+        self.texts = {}
+        for notes_or_tasks in ("tasks", "notes"):
+            for index, text in enumerate(getattr(planner, notes_or_tasks)):
+                self.set((notes_or_tasks, index), text)
+        for date, day in days.items():
+            for task_index, text in enumerate(day):
+                self.set(("day", date, task_index), text)
+        self.built = True
+
+    def set(self, key : tuple, text : str):
+        '''
+        Indexes the new text of a box, in place of its old text.
+
+        Parameters:
+        key (tuple): The key of the box (see texts).
+        text (str): The new text of the box.
+        '''
+        old_words = set(WORD.findall(self.texts.get(key, "").lower()))
+        new_words = set(WORD.findall(text.lower()))
+        for word in old_words - new_words:
+            keys = self.postings[word]
+            keys.discard(key)
+            if not keys:
+                del self.postings[word]
+                del self.words[bisect.bisect_left(self.words, word)]
+        for word in new_words - old_words:
+            if word not in self.postings:
+                self.postings[word] = set()
+                bisect.insort(self.words, word)
+            self.postings[word].add(key)
+        if text:
+            self.texts[key] = text
+        else:
+            self.texts.pop(key, None)
+
+    def apply_record(self, record : tuple):
+        #Updates the index with an edit, given as a journal record.
+        if record[0] == "cell":
+            _, date, task_index, text = record
+            self.set(("day", date, task_index), text)
+        elif record[0] == "text":
+            _, notes_or_tasks, index, text = record
+            self.set((notes_or_tasks, index), text)
+
+    def matching(self, prefix : str) -> set:
+        #Returns the keys of the boxes containing a word starting with prefix.
+        keys = set()
+        for i in range(bisect.bisect_left(self.words, prefix), len(self.words)):
+            if not self.words[i].startswith(prefix):
+                break
+            keys |= self.postings[self.words[i]]
+        return keys
+
+    def search(self, query : str, limit : int) -> list:
+        '''
+        Finds the boxes containing every word of a query. The last word also matches longer words starting with it,
+        so results show up while it is still being typed.
+
+        Parameters:
+        query (str): The words searched for.
+        limit (int): The max amount of results returned.
+
+        Returns:
+        list : The keys of the matching boxes (see texts), the Tasks screen's first and then days in date order.
+        '''
+        words = WORD.findall(query.lower())
+        if not words:
+            return []
+        matches = [self.postings.get(word, set()) for word in words[:-1]]
+        if query[-1:].isspace() or not query[-1:].isalnum():
+            matches.append(self.postings.get(words[-1], set())) #The last word has been finished.
+        else:
+            matches.append(self.matching(words[-1]))
+        matches.sort(key=len) #Intersecting from the smallest set does the least work.
+        keys = set(matches[0]).intersection(*matches[1:])
+        return heapq.nsmallest(limit, keys, key=lambda key: (key[0] != "tasks", key[0] != "notes", key[1:]))
+
+def grow_rows(tasks : list, notes : list, count : int):
+    '''
+    Adds empty strings to the task and note lists (which are always the same length) until they hold count strings.
+
+    Parameters:
+    tasks (list): The task strings.
+    notes (list): The note strings.
+    count (int): The amount of strings each list should hold at least.
+    '''
+    count = min(count, MAX_ROWS)
+    for texts in (tasks, notes):
+        if len(texts) < count:
+            texts.extend([""]*(count - len(texts)))
+
+def default_data() -> dict:
+    #Returns the data of a new planner, used for anything that hasnt been saved yet.
+    return {"tick_marks": {subject: 0 for subject in SUBJECTS}, "tasks": ["" for _ in range(MAX_TASKS)],
+            "notes": ["" for _ in range(MAX_TASKS)], "days": {}, "rules": [], "history": empty_history()}
+
+class Journal:
+    '''
+    An append-only journal of edits made since data.pickle (the snapshot) was last written. Each edit is appended
+    as one small pickled record, so saving an edit costs the size of that edit rather than of all the data.
+    On startup the journal is replayed on top of the snapshot, and once it grows past COMPACT_RECORDS it is
+    folded into a new snapshot and emptied.
+
+    Records mostly store the new value (not a difference), so replaying a record twice gives the same result:
+    ("cell", "YYYY-MM-DD", task_index, text), ("text", notes_or_tasks, index, text), ("rules", [rule tuples]) and
+    ("tick", subject, count, time, delta). A tick record also adds its change to the history, unless the history
+    already has a change as new as it (so it has been applied before). Imports add ("rule", rule tuple), adding one
+    rule unless an identical one is already saved, and ("history", subject, time, delta), adding one change to the
+    history in the same way as a tick record (so importing a file twice doesnt duplicate anything).
+
+    Attributes:
+    path (str): File path of the journal.
+    records (int): Amount of records written since the journal was last emptied.
+    file (file): The journal opened for appending (opened on the first edit).
+    '''
+    def __init__(self, path : str):
+        self.path = path
+        self.records = 0
+        self.last_append = 0.0
+        self.file = None
+        self.rotated_path = path + ".1" #Holds the edits of a snapshot that is still being written by the autosaver.
+
+    def append(self, record : tuple):
+        '''
+        Appends one edit to the journal, flushing it straight away so it survives the app crashing.
+
+        Parameter:
+        record (tuple): The edit, in one of the formats above.
+        '''
+        if self.file is None:
+            self.file = open(self.path, "ab")
+        pickle.dump(record, self.file)
+        self.file.flush()
+        self.records += 1
+        self.last_append = time.monotonic()
+
+    def append_many(self, records : list):
+        #Appends a batch of edits, flushing once for all of them.
+        if self.file is None:
+            self.file = open(self.path, "ab")
+        for record in records:
+            pickle.dump(record, self.file)
+        self.file.flush()
+        self.records += len(records)
+        self.last_append = time.monotonic()
+
+    def replay(self, data : dict) -> int:
+        '''
+        Applies all the records in the journal onto the given data. A record cut short by a crash ends the replay.
+
+        Parameter:
+        data (dict): Data in the same format as is saved in data.pickle (see default_data).
+
+        Returns:
+        int : Amount of records applied.
+        '''
+        applied = 0
+        for path in (self.rotated_path, self.path): #Oldest edits first.
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                while True:
+                    try:
+                        record = pickle.load(f)
+                    except Exception: #EOF, or a record that was only partly written.
+                        break
+                    apply_record(data, record)
+                    applied += 1
+        return applied
+
+    def needs_compaction(self) -> bool:
+        return self.records >= COMPACT_RECORDS
+
+    def clear(self):
+        #Empties the journal, only to be done once its edits are in the snapshot.
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        with open(self.path, "wb") as _:
+            pass
+        self.discard_rotated()
+        self.records = 0
+
+    def rotate(self):
+        '''
+        Moves the current edits aside (to rotated_path) as a snapshot of them is taken, so edits made while the
+        snapshot is being written go into a fresh journal. If an earlier rotated journal was never discarded (its
+        snapshot failed), the edits are added onto the end of it instead.
+        '''
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.path):
+            if os.path.exists(self.rotated_path):
+                with open(self.path, "rb") as current, open(self.rotated_path, "ab") as rotated:
+                    rotated.write(current.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.rotated_path)
+        self.records = 0
+
+    def discard_rotated(self):
+        #Deletes the rotated journal, once the snapshot holding its edits has been written.
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+def apply_record(data : dict, record : tuple):
+    '''
+    Applies a single journal record onto some data.
+
+    Parameters:
+    data (dict): Data in the same format as is saved in data.pickle (see default_data).
+    record (tuple): A journal record.
+    '''
+    if record[0] == "cell":
+        if len(record) == 5: #Written before the Calendar spanned more than 2024, as (month, day index).
+            record = ("cell", cell_date(record[1], record[2])) + record[3:]
+        _, date, task_index, text = record
+        Calendar_store(data["days"]).set(date, task_index, text)
+    elif record[0] == "text":
+        _, notes_or_tasks, index, text = record
+        if index < MAX_ROWS:
+            grow_rows(data["tasks"], data["notes"], index + 1)
+            data[notes_or_tasks][index] = text
+    elif record[0] == "tick":
+        data["tick_marks"][record[1]] = record[2]
+        if len(record) == 5: #Written before tick changes were kept in a history, as (subject, count).
+            _, subject, _, when, delta = record
+            apply_record(data, ("history", subject, when, delta))
+    elif record[0] == "history":
+        _, subject, when, delta = record
+        history = data.setdefault("history", empty_history())
+        if not history["times"] or when > history["times"][-1]:
+            append_history(history, when, subject, delta)
+    elif record[0] == "rules":
+        data["rules"] = list(record[1])
+    elif record[0] == "rule":
+        rules = data.setdefault("rules", [])
+        if tuple(record[1]) not in map(tuple, rules): #Already added, by an earlier import of the same file.
+            rules.append(record[1])
+
+class Autosaver:
+    '''
+    Writes data.pickle in a background thread, so the main loop never waits on the disk. A save is started once
+    no edits have been made for AUTOSAVE_DELAY seconds (so a burst of typing only causes one save), or straight
+    away once the journal needs compacting. The data is copied on the main thread, then pickled and written
+    by the worker thread.
+
+    Attributes:
+    delay (float): Seconds without edits before a save is started.
+    path (str): File path of the snapshot.
+    jobs (queue.Queue): Copies of the data waiting to be written (None stops the worker).
+    idle (threading.Event): Set while the worker isnt writing anything.
+    saves (int): Amount of snapshots written.
+    errors (int): Amount of snapshots that failed to be written (their edits stay in the journal).
+    thread (threading.Thread): The worker thread.
+    '''
+    def __init__(self, delay : float, path : str):
+        self.delay = delay
+        self.path = path
+        self.jobs = queue.Queue()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.saves = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def poll(self, data : dict):
+        '''
+        Called every frame, starts a background save if there are unsaved edits and the typing has settled down.
+
+        Parameter:
+        data (dict): The live data (see default_data), which is copied before being handed to the worker.
+        '''
+        if journal.records == 0 or not self.idle.is_set():
+            return
+        if time.monotonic() - journal.last_append < self.delay and not journal.needs_compaction():
+            return
+        snapshot = copy_data(data)
+        journal.rotate()
+        self.idle.clear()
+        self.jobs.put(snapshot)
+
+    def ms_until_due(self) -> int:
+        #Returns the ms until the next autosave should start (None if there are no unsaved edits), used as a timer for idle waiting.
+        if journal.records == 0:
+            return None
+        if not self.idle.is_set():
+            return 100 #Checks back shortly, once the current save has finished.
+        return int((journal.last_append + self.delay - time.monotonic())*1000) + 1
+
+    def run(self):
+        #Worker thread loop, writes each snapshot handed to it.
+        while True:
+            snapshot = self.jobs.get()
+            if snapshot is None:
+                break
+            try:
+                write_snapshot(snapshot, self.path)
+                journal.discard_rotated()
+                self.saves += 1
+            except OSError:
+                self.errors += 1
+            finally:
+                self.idle.set()
+
+    def stop(self):
+        #Finishes any save in progress and stops the worker thread.
+        self.jobs.put(None)
+        self.thread.join()
+
+journal = Journal(JOURNAL_FILE)
+
+def copy_data(data : dict) -> dict:
+    '''
+    Copies the data deep enough that later edits dont change the copy. The strings themselves are shared,
+    so this only copies the lists holding them.
+
+    Parameter:
+    data (dict): Data in the same format as is saved in data.pickle (see default_data).
+
+    Returns:
+    dict : The copy.
+    '''
+    return {
+        "tick_marks": dict(data["tick_marks"]),
+        "tasks": list(data["tasks"]),
+        "notes": list(data["notes"]),
+        "days": {date: day[:] for date, day in data["days"].items()},
+        "rules": list(data.get("rules", ())),
+        "history": {name: column[:] for name, column in data.get("history", empty_history()).items()}
+    }
+
+def write_snapshot(data : dict, path : str):
+    '''
+    Pickles data into a temporary file and only then swaps it in place of path, so an interrupted write can never
+    leave a half written file behind.
+
+    Parameters:
+    data (dict): The data to save.
+    path (str): File path of the snapshot.
+    '''
+    data = dict(data, tick_marks=dict(data["tick_marks"])) #Ticks are saved as a plain dict, whatever they are kept in.
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def cell_date(month : str, day : int) -> str:
+    #Returns the date (YYYY-MM-DD) of a day in the old 2024 only Calendar, given its month name and index in that month.
+    return datetime.date(2024, MONTHS.index(month) + 1, day + 1).isoformat()
+
+def month_data_to_days(month_data : dict) -> dict:
+    '''
+    Converts the old 2024 only calendar data (every day of every month) into the sparse days of a Calendar_store.
+
+    Parameter:
+    month_data (dict): Each month name with a list of each day's task box strings.
+
+    Returns:
+    dict : Only the days with content, keyed by date.
+    '''
+    days = {}
+    for month, month_days in month_data.items():
+        for day, day_tasks in enumerate(month_days):
+            if any(day_tasks):
+                days[cell_date(month, day)] = list(day_tasks)
+    return days
+
+class Storage:
+    '''
+    Interface for where the data is kept, so load_data and save dont depend on the backend (see STORAGE).
+    Data is passed around in the same format as default_data, and edits as journal records (see Journal).
+    '''
+    def load(self, default : dict) -> dict:
+        '''
+        Loads the saved data.
+
+        Parameter:
+        default (dict): The data to use for anything that hasnt been saved yet.
+
+        Returns:
+        dict : The data. Its days may leave out months, which are then fetched by load_month.
+        '''
+        raise NotImplementedError
+
+    def read(self, default : dict) -> dict:
+        #Loads the saved data without starting anything only the running app needs (eg: an autosaver), for tools like exports.
+        return self.load(default)
+
+    def iter_days(self, data : dict):
+        '''
+        Generates every day with content in date order, reading any days left out of the loaded data as it goes.
+
+        Parameter:
+        data (dict): The data returned by load or read.
+
+        Yields:
+        tuple : The date ("YYYY-MM-DD") and task box strings of a day.
+        '''
+        days = dict(self.load_days(), **data["days"])
+        for date in sorted(days):
+            yield date, days[date]
+
+    def load_month(self, year : int, month : int) -> dict:
+        #Returns the days with content in a month that was left out of the loaded days.
+        return {}
+
+    def load_days(self) -> dict:
+        #Returns every day with content that was left out of the loaded days (eg: to search all of them).
+        return {}
+
+    def write(self, record : tuple):
+        #Saves a single edit.
+        raise NotImplementedError
+
+    def write_many(self, records : list):
+        #Saves a batch of edits (eg: from an import), which backends can write together.
+        for record in records:
+            self.write(record)
+
+    def save(self, data : dict):
+        #Saves all the data at once.
+        raise NotImplementedError
+
+    def poll(self, data : dict):
+        #Called every frame, for any background saving the backend does.
+        pass
+
+    def ms_until_due(self) -> int:
+        #Returns the ms until the backend next needs polling (None if it doesnt), used as a timer for idle waiting.
+        return None
+
+    def close(self, data : dict):
+        #Saves everything and closes the storage, as the app is closed.
+        self.save(data)
+
+    def clear(self):
+        #Deletes all saved data.
+        raise NotImplementedError
+
+class Pickle_storage(Storage):
+    '''
+    Keeps the data as a snapshot in a pickle file, with edits since the snapshot kept in the journal and
+    folded into the snapshot by the Autosaver.
+
+    Attributes:
+    path (str): File path of the snapshot.
+    autosaver (Autosaver): Writes the snapshot in the background (started once the data is loaded).
+    replayed (int): Amount of journal records replayed when the data was last read.
+    '''
+    def __init__(self, path : str):
+        self.path = path
+        self.autosaver = None
+        self.replayed = 0
+
+    def read(self, default : dict) -> dict:
+        #Returns the data in the snapshot (or default, if there isnt one) with the journal replayed on top.
+        data = default
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    data = pickle.load(f)
+            except EOFError:
+                pass #An empty file, so nothing has been saved.
+        if "month_data" in data: #Saved before the Calendar spanned more than 2024.
+            data["days"] = month_data_to_days(data.pop("month_data"))
+        self.replayed = journal.replay(data)
+        return data
+
+    def load(self, default : dict) -> dict:
+        data = self.read(default)
+        if self.replayed > 0:
+            self.save(data) #Folds the replayed edits into the snapshot.
+        self.autosaver = Autosaver(AUTOSAVE_DELAY, self.path)
+        return data
+
+    def write(self, record : tuple):
+        journal.append(record)
+
+    def write_many(self, records : list):
+        journal.append_many(records)
+
+    def save(self, data : dict):
+        #Saves a new snapshot, which makes the journal's edits redundant, so it is emptied.
+        write_snapshot(data, self.path)
+        journal.clear()
+
+    def poll(self, data : dict):
+        if self.autosaver is not None:
+            self.autosaver.poll(data)
+
+    def ms_until_due(self) -> int:
+        return self.autosaver.ms_until_due() if self.autosaver is not None else None
+
+    def close(self, data : dict):
+        if self.autosaver is not None:
+            self.autosaver.stop()
+            self.autosaver = None
+        self.save(data)
+
+    def clear(self):
+        with open(self.path, "wb") as _:
+            pass
+        journal.clear()
+
+class Sqlite_storage(Storage):
+    '''
+    Keeps the data in an SQLite database (in WAL mode), where each calendar task box is its own row keyed by
+    date and slot. Months are only read when the Calendar needs them, and each edit is written as a single
+    row in its own transaction, so nothing needs saving all at once.
+    The first time it is used, any data in data.pickle (and its journal) is copied into the database.
+
+    Attributes:
+    path (str): File path of the database.
+    connection (sqlite3.Connection): The open database.
+    '''
+    def __init__(self, path : str):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False) #Loaded on App's worker thread, but only ever used by one thread at a time.
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS cells (date TEXT, slot INTEGER, text TEXT, PRIMARY KEY (date, slot))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS texts (list TEXT, idx INTEGER, text TEXT, PRIMARY KEY (list, idx))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS ticks (subject TEXT PRIMARY KEY, count INTEGER)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS rules (idx INTEGER PRIMARY KEY, kind TEXT, text TEXT, start TEXT, interval INTEGER, until TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS history (time REAL, subject TEXT, delta INTEGER)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS history_time ON history (time)") #Finds the newest change quickly.
+
+    def migrate(self, default : dict):
+        #Copies the data from data.pickle into the database, only done once.
+        if self.connection.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+            return
+        with self.connection:
+            if os.path.exists("data.pickle"):
+                self.save_rows(Pickle_storage("data.pickle").read(copy_data(default)))
+            self.connection.execute("INSERT INTO meta VALUES ('migrated', ?)", (datetime.datetime.now().isoformat(),))
+
+    def load(self, default : dict) -> dict:
+        self.migrate(default)
+        data = copy_data(default)
+        data["days"] = {} #Months are fetched by load_month when needed.
+        for subject, count in self.connection.execute("SELECT subject, count FROM ticks"):
+            data["tick_marks"][subject] = count
+        for notes_or_tasks, index, text in self.connection.execute("SELECT list, idx, text FROM texts"):
+            if index < MAX_ROWS:
+                grow_rows(data["tasks"], data["notes"], index + 1)
+                data[notes_or_tasks][index] = text
+        data["rules"] = [tuple(row) for row in self.connection.execute("SELECT kind, text, start, interval, until FROM rules ORDER BY idx")]
+        data["history"] = empty_history()
+        for when, subject, delta in self.connection.execute("SELECT time, subject, delta FROM history ORDER BY rowid"):
+            append_history(data["history"], when, subject, delta)
+        return data
+
+    def load_month(self, year : int, month : int) -> dict:
+        store = Calendar_store()
+        rows = self.connection.execute("SELECT date, slot, text FROM cells WHERE date BETWEEN ? AND ?", (f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-31"))
+        for date, slot, text in rows:
+            store.set(date, slot, text)
+        return store.days
+
+    def load_days(self) -> dict:
+        store = Calendar_store()
+        for date, slot, text in self.connection.execute("SELECT date, slot, text FROM cells"):
+            store.set(date, slot, text)
+        return store.days
+
+    def iter_days(self, data : dict):
+        #Every edit is already in the database, so the days are read a row at a time rather than all at once.
+        day = None
+        for date, slot, text in self.connection.execute("SELECT date, slot, text FROM cells ORDER BY date, slot"):
+            if day is None or date != day[0]:
+                if day is not None:
+                    yield day
+                day = (date, list(EMPTY_DAY))
+            day[1][slot] = text
+        if day is not None:
+            yield day
+
+    def write(self, record : tuple):
+        with self.connection: #Each edit is its own transaction.
+            self.write_row(record)
+
+    def write_many(self, records : list):
+        with self.connection: #The whole batch is one transaction.
+            for record in records:
+                self.write_row(record)
+
+    def write_row(self, record : tuple):
+        #Writes a journal record as a row (empty task boxes are deleted, so only days with content are stored).
+        if record[0] == "cell":
+            _, date, task_index, text = record
+            if text:
+                self.connection.execute("INSERT OR REPLACE INTO cells VALUES (?, ?, ?)", (date, task_index, text))
+            else:
+                self.connection.execute("DELETE FROM cells WHERE date = ? AND slot = ?", (date, task_index))
+        elif record[0] == "text":
+            self.connection.execute("INSERT OR REPLACE INTO texts VALUES (?, ?, ?)", record[1:])
+        elif record[0] == "tick":
+            self.connection.execute("INSERT OR REPLACE INTO ticks VALUES (?, ?)", record[1:3])
+            if len(record) == 5:
+                _, subject, _, when, delta = record
+                self.write_row(("history", subject, when, delta))
+        elif record[0] == "history":
+            #Like apply_record, a change is only added if it is newer than every saved one (so it hasnt been added before).
+            self.connection.execute("INSERT INTO history SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM history WHERE time >= ?)",
+                                    (record[2], record[1], record[3], record[2]))
+        elif record[0] == "rules":
+            self.connection.execute("DELETE FROM rules")
+            self.connection.executemany("INSERT INTO rules VALUES (?, ?, ?, ?, ?, ?)", [(index,) + tuple(rule) for index, rule in enumerate(record[1])])
+        elif record[0] == "rule":
+            #Skipped if an identical rule is already saved, by an earlier import of the same file.
+            self.connection.execute("INSERT INTO rules SELECT (SELECT COUNT(*) FROM rules), ?, ?, ?, ?, ? WHERE NOT EXISTS "
+                                    "(SELECT 1 FROM rules WHERE kind = ? AND text = ? AND start = ? AND interval = ? AND until IS ?)",
+                                    tuple(record[1]) * 2)
+
+    def save_rows(self, data : dict):
+        #Writes all the given data as rows (without committing).
+        for subject, count in data["tick_marks"].items():
+            self.write_row(("tick", subject, count))
+        for notes_or_tasks in ("tasks", "notes"):
+            for index, text in enumerate(data[notes_or_tasks]):
+                self.write_row(("text", notes_or_tasks, index, text))
+        for date, day_tasks in data["days"].items():
+            for task_index, text in enumerate(day_tasks):
+                self.write_row(("cell", date, task_index, text))
+        self.write_row(("rules", data.get("rules", [])))
+        history = data.get("history", empty_history())
+        self.connection.execute("DELETE FROM history")
+        self.connection.executemany("INSERT INTO history VALUES (?, ?, ?)",
+                                    zip(history["times"], (history["names"][subject] for subject in history["subjects"]), history["deltas"]))
+
+    def save(self, data : dict):
+        with self.connection:
+            self.save_rows(data)
+
+    def close(self, data : dict):
+        #Every edit has already been written, so the database only needs closing.
+        self.connection.close()
+
+    def clear(self):
+        with self.connection:
+            for table in ("cells", "texts", "ticks", "rules", "history"):
+                self.connection.execute(f"DELETE FROM {table}")
+
+def open_storage(backend : str) -> Storage:
+    #Returns the storage obj for a backend name (see STORAGE).
+    if backend == "sqlite":
+        return Sqlite_storage(DATABASE_FILE)
+    return Pickle_storage("data.pickle")
@@ -0,0 +1,222 @@
+'''
+Replays input sessions against the Task Manager headlessly (using SDL's dummy video driver) and as fast as possible,
+with the clock the app sees driven by the recorded timestamps, so a replay always ends in the same state. Reports the
+time from handling each frame's events to that frame being drawn, and checksums of the end state (days, tasks, notes
+and tick_marks) to compare between changes.
+
+Sessions are recorded with:
+python Task_Manager.py --record session.log
+
+Usage:
+python replay.py session.log [--output results.json]
+python replay.py --typing-burst 5000 [--keys-per-frame 10] [--output results.json]
+'''
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") #Must be set before pygame is initialised.
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") #Keeps the printed results valid JSON.
+
+import argparse
+import datetime
+import hashlib
+import json
+import time
+
+import pygame
+import Task_Manager as tm
+from benchmark import Null_storage, percentile
+
+class Replay_source(tm.Input_source):
+    '''
+    Input source returning the recorded mouse state and time of the frame being replayed.
+
+    Attributes:
+    start (datetime.datetime): When the session was recorded.
+    pos (tuple): The mouse's position in the current frame.
+    pressed (tuple): Whether the (left, middle, right) mouse buttons are held in the current frame.
+    ms (int): Milliseconds from the start of the session to the current frame.
+    '''
+    def __init__(self, start : datetime.datetime):
+        self.start = start
+        self.pos = (0, 0)
+        self.pressed = (False, False, False)
+        self.ms = 0
+
+    def set_frame(self, frame : list):
+        #Moves on to a frame of the log.
+        _, self.ms, pos, pressed, _ = frame
+        self.pos = tuple(pos)
+        self.pressed = tuple(pressed)
+
+    def get_pos(self) -> tuple:
+        return self.pos
+
+    def get_pressed(self) -> tuple:
+        return self.pressed
+
+    def now(self) -> datetime.datetime:
+        return self.start + datetime.timedelta(milliseconds=self.ms)
+
+def read_log(path : str) -> tuple:
+    '''
+    Reads a session recorded by Task_Manager.Input_recorder.
+
+    Parameter:
+    path (str): The file path of the log.
+
+    Returns:
+    tuple : The header (dict) and the frames (list) of the log.
+    '''
+    with open(path) as f:
+        header = json.loads(f.readline())
+        if header.get("version") != 1:
+            raise ValueError(f"{path} is not a session log this version can replay")
+        frames = [json.loads(line) for line in f if line.strip()]
+    return header, frames
+
+def decode_events(events : list) -> list:
+    #Turns logged events back into pygame events (JSON stores tuples, like pos, as lists).
+    return [pygame.event.Event(event_type, {k: tuple(v) if isinstance(v, list) else v for k, v in attributes.items()})
+            for event_type, attributes in events]
+
+def checksum(value) -> str:
+    return hashlib.sha256(repr(value).encode()).hexdigest()[:16]
+
+def end_state(app : tm.App) -> dict:
+    #Returns checksums of the app's data, which match between replays of the same session.
+    data = app.get_data()
+    return {
+        "days": checksum(sorted((date, tuple(tasks)) for date, tasks in data["days"].items())),
+        "tasks": checksum(data["tasks"]),
+        "notes": checksum(data["notes"]),
+        "tick_marks": checksum(sorted(data["tick_marks"].items()))
+    }
+
+def build_app(start : datetime.datetime) -> tuple:
+    #Builds the app against an off-screen surface and no saved data, with its input coming from a replay source.
+    source = Replay_source(start)
+    tm.input_source = source
+    tm.screen = pygame.Surface((tm.WIDTH, tm.HEIGHT))
+    tm.storage = Null_storage()
+    app = tm.App(tm.assets.image(tm.TICK_IMAGE))
+    app.load()
+    return app, source
+
+def typing_session(app : tm.App, keystrokes : int, keys_per_frame : int) -> list:
+    '''
+    Generates a session that opens today in the Calendar, then types into its first task box in bursts.
+
+    Parameters:
+    app (App): The app the session is replayed against (for the positions of what is clicked).
+    keystrokes (int): Amount of keys typed, every tenth is a backspace (letters are a KEYDOWN followed by a TEXTINPUT, as pygame sends them).
+    keys_per_frame (int): Amount of keys typed in each frame.
+
+    Returns:
+    list : The frames of the session, as read by read_log.
+    '''
+    def click(frame, pos):
+        return [frame, frame*1000//tm.FPS, list(pos), [True, False, False], [[pygame.MOUSEBUTTONDOWN, {"pos": list(pos), "button": 1}]]]
+
+    def keys(frame, events):
+        return [frame, frame*1000//tm.FPS, [0, 0], [False, False, False], events]
+
+    calendar = app.calendar
+    frame = tm.FPS + 1 #The buttons only take clicks once they have cooled down.
+    frames = [click(frame, app.calendar_button.rect.center),
+              click(frame + 1, calendar.get_day_rects()[calendar.day - 1].center),
+              click(frame + 2, calendar.task_rects[0].center)]
+    frame += 3
+    events = []
+    for i in range(keystrokes):
+        if i % 10 == 9:
+            events.append([pygame.KEYDOWN, {"key": pygame.K_BACKSPACE, "unicode": "\b", "mod": 0}])
+        else:
+            letter = chr(ord("a") + i % 26)
+            events.append([pygame.KEYDOWN, {"key": ord(letter), "unicode": letter, "mod": 0}])
+            events.append([pygame.TEXTINPUT, {"text": letter}])
+        if (i + 1) % keys_per_frame == 0: #Counts keystrokes, as letters are two events each.
+            frames.append(keys(frame, events))
+            frame += 1
+            events = []
+    events.append([pygame.KEYDOWN, {"key": pygame.K_ESCAPE, "unicode": "\x1b", "mod": 0}])
+    frames.append(keys(frame, events))
+    frames.append(keys(frame + 1, [[pygame.QUIT, {}]]))
+    return frames
+
+def replay(app : tm.App, source : Replay_source, frames : list) -> dict:
+    '''
+    Replays frames against the app, without waiting between them.
+
+    Parameters:
+    app (App): The app built by build_app.
+    source (Replay_source): The app's input source.
+    frames (list): The frames of the session.
+
+    Returns:
+    dict : The latencies in microseconds, throughput and the end state's checksums.
+    '''
+    latencies = []
+    events_handled = 0
+    last_frame = 0
+    tm.renderer.mark_all()
+    start = time.perf_counter()
+    for frame in frames:
+        #Frames without any input only count towards the buttons' cooldown, which stops counting at FPS.
+        for _ in range(min(frame[0] - last_frame, tm.FPS)):
+            tm.increment_button_ticks(app.buttons)
+        last_frame = frame[0]
+        source.set_frame(frame)
+        events = decode_events(frame[4]) + pygame.event.get(tm.REMINDER_EVENT) #Reminders arent recorded, the app posts them again.
+
+        frame_start = time.perf_counter_ns()
+        for event in events:
+            app.handle_event(event)
+        app.update()
+        if tm.renderer.begin_frame(tm.screen):
+            app.draw()
+            tm.renderer.end_frame(tm.screen)
+        latencies.append(time.perf_counter_ns() - frame_start)
+        events_handled += len(events)
+        if not app.running:
+            break
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    return {
+        "frames": len(latencies),
+        "events": events_handled,
+        "seconds": elapsed,
+        "events_per_second": events_handled/elapsed if elapsed else None,
+        "latency_mean_us": sum(latencies)/len(latencies)/1000 if latencies else None,
+        "latency_p50_us": percentile(latencies, 0.5)/1000 if latencies else None,
+        "latency_p99_us": percentile(latencies, 0.99)/1000 if latencies else None,
+        "latency_max_us": latencies[-1]/1000 if latencies else None,
+        "frames_drawn": tm.renderer.frames_drawn,
+        "end_state": end_state(app)
+    }
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replays input sessions against the Task Manager headlessly.")
+    parser.add_argument("log", nargs="?", help="session log recorded with Task_Manager.py --record")
+    parser.add_argument("--typing-burst", type=int, metavar="KEYS", help="replay a generated session typing this many keys into the calendar instead")
+    parser.add_argument("--keys-per-frame", type=int, default=10, help="keys typed per frame in a typing burst")
+    parser.add_argument("--output", help="file to write the JSON results to (printed if not given)")
+    args = parser.parse_args(argv)
+    if (args.log is None) == (args.typing_burst is None):
+        parser.error("give either a session log or --typing-burst")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.log:
+        header, frames = read_log(args.log)
+        app, source = build_app(datetime.datetime.fromisoformat(header["start"]))
+    else:
+        app, source = build_app(datetime.datetime(2024, 1, 1, 12)) #A fixed start, so generated sessions always end the same.
+        frames = typing_session(app, args.typing_burst, args.keys_per_frame)
+    results = json.dumps(replay(app, source, frames), indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(results)
+    else:
+        print(results)